@@ -27,14 +27,23 @@
         'views/templates.xml',
         'wizards/select_lang.xml',
         'views/views.xml',
+        'wizards/print_label.xml',
+        'wizards/sdscom_import.xml',
+        'wizards/sdscom_export.xml',
+        'wizards/clone_datasheet.xml',
+        'views/consistency.xml',
+        'views/exposure_limit.xml',
+        'views/dashboard.xml',
+        'views/un_entry.xml',
         'reports/report_sds.xml',
+        'reports/report_label.xml',
         'data/pictogram.xml',
-        'data/precautionary_statement.xml',
-        'data/hazard_class.xml',
-        'data/hazard_statement.xml',
-        'data/sentences.xml',
+        'data/regulation_dataset.xml',
         'data/chemical_properties.xml',
         'data/chemical_substances.xml',
+        'data/consistency_cron.xml',
+        'data/dashboard.xml',
+        'data/sentence_ranking.xml',
         
     ],
     # only loaded in demonstration mode
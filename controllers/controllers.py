@@ -1,20 +1,47 @@
 # -*- coding: utf-8 -*-
 from odoo import http
+from odoo.http import request, send_file
 
-# class /users/baba/nuvola.ecobeton.it/amministrazione/odoo/moduliEcobeton/12.0/safetyDatasheet(http.Controller):
-#     @http.route('//users/baba/nuvola.ecobeton.it/amministrazione/odoo/moduli_ecobeton/12.0/safety_datasheet//users/baba/nuvola.ecobeton.it/amministrazione/odoo/moduli_ecobeton/12.0/safety_datasheet/', auth='public')
-#     def index(self, **kw):
-#         return "Hello, world"
-
-#     @http.route('//users/baba/nuvola.ecobeton.it/amministrazione/odoo/moduli_ecobeton/12.0/safety_datasheet//users/baba/nuvola.ecobeton.it/amministrazione/odoo/moduli_ecobeton/12.0/safety_datasheet/objects/', auth='public')
-#     def list(self, **kw):
-#         return http.request.render('/users/baba/nuvola.ecobeton.it/amministrazione/odoo/moduli_ecobeton/12.0/safety_datasheet.listing', {
-#             'root': '//users/baba/nuvola.ecobeton.it/amministrazione/odoo/moduli_ecobeton/12.0/safety_datasheet//users/baba/nuvola.ecobeton.it/amministrazione/odoo/moduli_ecobeton/12.0/safety_datasheet',
-#             'objects': http.request.env['/users/baba/nuvola.ecobeton.it/amministrazione/odoo/moduli_ecobeton/12.0/safety_datasheet./users/baba/nuvola.ecobeton.it/amministrazione/odoo/moduli_ecobeton/12.0/safety_datasheet'].search([]),
-#         })
-
-#     @http.route('//users/baba/nuvola.ecobeton.it/amministrazione/odoo/moduli_ecobeton/12.0/safety_datasheet//users/baba/nuvola.ecobeton.it/amministrazione/odoo/moduli_ecobeton/12.0/safety_datasheet/objects/<model("/users/baba/nuvola.ecobeton.it/amministrazione/odoo/moduli_ecobeton/12.0/safety_datasheet./users/baba/nuvola.ecobeton.it/amministrazione/odoo/moduli_ecobeton/12.0/safety_datasheet"):obj>/', auth='public')
-#     def object(self, obj, **kw):
-#         return http.request.render('/users/baba/nuvola.ecobeton.it/amministrazione/odoo/moduli_ecobeton/12.0/safety_datasheet.object', {
-#             'object': obj
-#         })
\ No newline at end of file
+from odoo.addons.safety_datasheet.models.models import PREVIEW_SECTIONS
+
+
+class SdsPreview(http.Controller):
+
+    @http.route(['/safety_datasheet/preview/<int:datasheet_id>',
+                 '/safety_datasheet/preview/<int:datasheet_id>/<string:section>'], type='http', auth='user')
+    def preview(self, datasheet_id, section=None, lang='en_US', **kw):
+        """
+        HTML preview of a datasheet in the given language, or of one of its sections only
+        (the preview page reloads a single section through the second route)
+        """
+        datasheet = request.env['sds.datasheet'].browse(datasheet_id).exists()
+        if not datasheet or (section and section not in PREVIEW_SECTIONS):
+            return request.not_found()
+        return request.make_response(datasheet.render_preview(lang, section),
+                                     headers=[('Content-Type', 'text/html; charset=utf-8')])
+
+
+class SdsSentencePicker(http.Controller):
+
+    @http.route('/safety_datasheet/sentences/<string:category>', type='json', auth='user')
+    def sentences(self, category, name='', limit=None, **kw):
+        """
+        Sentences of a category for the sentence picker, the most used first, in the language of the user
+        """
+        return request.env['sds.sentences'].get_picker(category, name=name, limit=limit)
+
+
+class SdscomExport(http.Controller):
+
+    @http.route('/safety_datasheet/sdscom_export/<int:wizard_id>', type='http', auth='user')
+    def download(self, wizard_id, **kw):
+        """
+        Zip archive of a SDScom export, streamed from its file (see sds.sdscom.export.wizard); the
+        access rules of the transient models only let the user who exported read the wizard
+        """
+        wizard = request.env['sds.sdscom.export.wizard'].browse(wizard_id).exists()
+        path = wizard and wizard._archive_path()
+        if not path:
+            return request.not_found()
+        return send_file(path, mimetype='application/zip', filename='sdscom.zip', as_attachment=True,
+                         cache_timeout=0)
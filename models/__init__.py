@@ -1,3 +1,15 @@
 # -*- coding: utf-8 -*-
 
+from . import cache_version
 from . import models
+from . import regulation_dataset
+from . import ir_module
+from . import consistency
+from . import ir_actions_report
+from . import report_data
+from . import exposure_limit
+from . import un_entry
+from . import sdscom_import
+from . import sdscom_export
+from . import dashboard
+from . import datasheet_clone
@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+
+from odoo import models, fields, api
+
+
+class SdsCacheVersion(models.Model):
+    """
+    Versions of the caches built from the reference data, e.g. the label elements of the hazard
+    statements. The version is part of the key of the cached method and is changed by the writes of
+    the records the cache is built from: only that cache is invalidated, instead of all the caches of
+    the registry emptied by clear_caches() (access rights, views, translations, ...).
+    The version is a row of this table, so the other workers and the concurrent transactions see the
+    new version with the new data, once the transaction is committed. A new version is taken from the
+    id sequence, never reused even by a transaction rolled back, so an entry cached from data which
+    were not committed is never read again.
+    """
+    _name = "sds.cache.version"
+    _description = "Reference data cache version"
+    _log_access = False
+
+    name = fields.Char('Cache', required=True, readonly=True)
+    version = fields.Integer('Version', readonly=True)
+
+    _sql_constraints = [
+        ('name_uniq', 'unique(name)', 'One version per cache'),
+    ]
+
+    @api.model
+    def get_version(self, name):
+        """
+        :param name: name of the cache, e.g. 'label_elements'
+        :return: current version, part of the key of the cache
+        """
+        self.env.cr.execute("SELECT version FROM sds_cache_version WHERE name = %s", (name,))
+        row = self.env.cr.fetchone()
+        return row[0] if row else 0
+
+    @api.model
+    def invalidate(self, name):
+        """
+        Change the version of a cache: its entries are no longer read
+        """
+        self.env.cr.execute("""
+            INSERT INTO sds_cache_version (name, version) VALUES (%(name)s, nextval('sds_cache_version_id_seq'))
+            ON CONFLICT (name) DO UPDATE SET version = EXCLUDED.version
+        """, {'name': name})
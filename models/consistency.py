@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+
+import logging
+
+from odoo import models, fields, api
+
+_logger = logging.getLogger(__name__)
+
+class SdsConsistencyViolation(models.Model):
+    """
+    Result of the consistency checks of the datasheets.
+    The whole table is rebuilt by run_checks(): every rule is a single INSERT ... SELECT over all
+    the datasheets, so the check of the full catalogue takes a handful of queries (see the nightly cron).
+    The label elements (signal word and pictograms) are instead compared in Python with the ones derived
+    from the classification by sds.hazard.statement._get_label_elements, the rules used to fill them.
+    """
+    _name = "sds.consistency.violation"
+    _description = "Datasheet consistency violation"
+    _order = "datasheet_id, rule"
+
+    RULES = [('not_hazardous_with_h', 'Not hazardous but with hazard statements'),
+             ('signal_missing', 'Signal word missing'),
+             ('signal_wrong', 'Signal word different from the classification'),
+             ('signal_not_hazardous', 'Signal word on a not hazardous product'),
+             ('pictogram_missing', 'Pictogram of a hazard statement missing on the label'),
+             ('pictogram_unexpected', 'Label pictogram not related to any hazard statement'),
+             ('component_missing_ids', 'Mixture component without CAS/EC number')]
+
+    datasheet_id = fields.Many2one('sds.datasheet', 'Datasheet', required=True, index=True, ondelete='cascade')
+    product_id = fields.Many2one(related='datasheet_id.product_id', readonly=True)
+    rule = fields.Selection(RULES, 'Rule', required=True, index=True)
+    detail = fields.Char('Detail')
+
+    @api.model
+    def _rule_queries(self):
+        """
+        :return: list of (rule, query), each query selects (datasheet_id, detail) and accepts the
+                 %(filter)s placeholder (condition on the datasheet alias d)
+        """
+        Datasheet = self.env['sds.datasheet']
+        label = Datasheet._fields['section_2_2_pictograms']
+        statement = self.env['sds.hazard.statement']._fields['pictogram_ids']
+        rel = {
+            'label_rel': label.relation, 'label_ds': label.column1, 'label_pic': label.column2,
+            'h_rel': statement.relation, 'h_stat': statement.column1, 'h_pic': statement.column2,
+        }
+        return [
+            ('not_hazardous_with_h', """
+                SELECT d.id, string_agg(h.code, ', ' ORDER BY h.code)
+                FROM sds_datasheet d
+                JOIN sds_regulation_criteria c ON c.datasheet_id = d.id
+                JOIN sds_hazard_statement h ON h.id = c."HazardStatement"
+                WHERE d.section_2_1_selector %(filter)s
+                GROUP BY d.id
+            """),
+            ('signal_not_hazardous', """
+                SELECT d.id, d.section_2_2_signal
+                FROM sds_datasheet d
+                WHERE d.section_2_1_selector AND d.section_2_2_signal IS NOT NULL %(filter)s
+            """),
+            ('pictogram_unexpected', """
+                SELECT d.id, string_agg(p.name, ', ' ORDER BY p.name)
+                FROM sds_datasheet d
+                JOIN {label_rel} lp ON lp.{label_ds} = d.id
+                JOIN sds_pictogram p ON p.id = lp.{label_pic}
+                WHERE NOT EXISTS (SELECT 1 FROM sds_regulation_criteria c
+                                  JOIN {h_rel} hp ON hp.{h_stat} = c."HazardStatement"
+                                  WHERE c.datasheet_id = d.id AND hp.{h_pic} = p.id) %(filter)s
+                GROUP BY d.id
+            """.format(**rel)),
+            ('component_missing_ids', """
+                SELECT d.id, string_agg(COALESCE(s.name, '-'), ', ' ORDER BY s.name)
+                FROM sds_datasheet d
+                JOIN sds_chemical_mixture m ON m.datasheet_id = d.id
+                LEFT JOIN sds_chemical_substances s ON s.id = m.substance
+                WHERE d.section_3_2_selector %(filter)s
+                AND (s.id IS NULL OR COALESCE(s."CASno", '') = '' OR COALESCE(s."ECno", '') = '')
+                GROUP BY d.id
+            """),
+        ]
+
+    @api.model
+    def run_checks(self, datasheet_ids=None):
+        """
+        Check the consistency of the datasheets and store the violations found
+        :param datasheet_ids: datasheets to check, all of them if None
+        :return: number of violations found
+        """
+        self._clear_violations(datasheet_ids)
+        params = {
+            'uid': self.env.uid,
+            'ids': list(datasheet_ids or []),
+        }
+        datasheet_filter = 'AND d.id = ANY(%(ids)s)' if datasheet_ids is not None else ''
+        count = 0
+        for rule, query in self._rule_queries():
+            self.env.cr.execute("""
+                INSERT INTO sds_consistency_violation (datasheet_id, rule, detail,
+                                                       create_uid, create_date, write_uid, write_date)
+                SELECT violation.datasheet_id, %(rule)s, violation.detail,
+                       %(uid)s, now() AT TIME ZONE 'UTC', %(uid)s, now() AT TIME ZONE 'UTC'
+                FROM ({}) AS violation(datasheet_id, detail)
+            """.format(query.replace('%(filter)s', datasheet_filter)), dict(params, rule=rule))
+            count += self.env.cr.rowcount
+        violations = self._label_violations(datasheet_filter, params)
+        if violations:
+            self.env.cr.execute("""
+                INSERT INTO sds_consistency_violation (datasheet_id, rule, detail,
+                                                       create_uid, create_date, write_uid, write_date)
+                SELECT violation.datasheet_id, violation.rule, violation.detail,
+                       %(uid)s, now() AT TIME ZONE 'UTC', %(uid)s, now() AT TIME ZONE 'UTC'
+                FROM unnest(%(datasheet_ids)s::int[], %(rules)s::varchar[], %(details)s::varchar[])
+                     AS violation(datasheet_id, rule, detail)
+            """, dict(params, datasheet_ids=[violation[0] for violation in violations],
+                      rules=[violation[1] for violation in violations],
+                      details=[violation[2] for violation in violations]))
+            count += len(violations)
+        self.invalidate_cache()
+        _logger.info("Datasheet consistency check: %d violations", count)
+        return count
+
+    @api.model
+    def _label_violations(self, datasheet_filter, params):
+        """
+        Compare the label elements of the hazardous datasheets with the ones derived from their
+        classification (signal word, pictograms with the precedence rules of CLP Article 26)
+        :return: list of (datasheet id, rule, detail)
+        """
+        label = self.env['sds.datasheet']._fields['section_2_2_pictograms']
+        cr = self.env.cr
+        cr.execute("""
+            SELECT d.id, d.section_2_2_signal, c."Classification", c."HazardStatement"
+            FROM sds_datasheet d
+            JOIN sds_regulation_criteria c ON c.datasheet_id = d.id
+            WHERE NOT d.section_2_1_selector AND NOT d.section_2_2_selector %(filter)s
+            ORDER BY d.id, c.id
+        """.replace('%(filter)s', datasheet_filter), params)
+        datasheets = {}
+        for datasheet_id, signal, class_id, statement_id in cr.fetchall():
+            datasheets.setdefault(datasheet_id, (signal, []))[1].append((class_id, statement_id))
+        if not datasheets:
+            return []
+        cr.execute("""
+            SELECT {ds}, array_agg({pic}) FROM {rel} WHERE {ds} = ANY(%s) GROUP BY {ds}
+        """.format(rel=label.relation, ds=label.column1, pic=label.column2), (list(datasheets),))
+        labels = dict(cr.fetchall())
+
+        Statement = self.env['sds.hazard.statement']
+        elements = Statement._label_elements_map()
+        pictogram_names = elements[2]
+        violations = []
+        for datasheet_id, (signal, lines) in datasheets.items():
+            expected_signal, pictogram_ids, precautionary_ids = Statement._get_label_elements(lines, elements)
+            if expected_signal and not signal:
+                violations.append((datasheet_id, 'signal_missing', expected_signal))
+            elif signal and signal != expected_signal:
+                violations.append((datasheet_id, 'signal_wrong', expected_signal or 'none'))
+            missing = sorted(pictogram_names[pictogram_id] for pictogram_id in pictogram_ids
+                             if pictogram_id not in labels.get(datasheet_id, []))
+            if missing:
+                violations.append((datasheet_id, 'pictogram_missing', ', '.join(missing)))
+        return violations
+
+    @api.model
+    def _clear_violations(self, datasheet_ids=None):
+        if datasheet_ids is None:
+            self.env.cr.execute("DELETE FROM sds_consistency_violation")
+        else:
+            self.env.cr.execute("DELETE FROM sds_consistency_violation WHERE datasheet_id = ANY(%s)",
+                                (list(datasheet_ids),))
+
+    @api.model
+    def action_run_checks(self):
+        self.run_checks()
+        return self.env.ref('safety_datasheet.action_consistency_violation').read()[0]
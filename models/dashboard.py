@@ -0,0 +1,211 @@
+# -*- coding: utf-8 -*-
+
+import logging
+
+from odoo import models, fields, api, _
+
+_logger = logging.getLogger(__name__)
+
+# fields of sds.datasheet counted by the dashboard: writing any other field leaves the counters unchanged
+DASHBOARD_FIELDS = ('section_2_1_selector', 'section_2_2_signal', 'section_2_2_pictograms', 'revision_date',
+                    'product_id')
+
+
+class SdsDashboardStat(models.Model):
+    """
+    Counters of the compliance dashboard, one row per metric and value (e.g. signal word 'danger').
+    The counters are updated by the writes of the datasheets and of the products: the rows of the
+    records written are counted before and after the write with the same GROUP BY queries used by
+    rebuild() and only the difference is added, so reading the dashboard costs a single query on a
+    table of a few dozen rows whatever the size of the catalogue.
+    """
+    _name = "sds.dashboard.stat"
+    _description = "Compliance dashboard counter"
+    _order = "metric, key"
+
+    METRICS = [('datasheets', 'Datasheets'),
+               ('hazard', 'Hazard'),
+               ('signal', 'Signal word'),
+               ('pictogram', 'Pictogram'),
+               ('revision_year', 'Year of revision'),
+               ('products', 'Products')]
+
+    metric = fields.Selection(METRICS, 'Metric', required=True, readonly=True)
+    key = fields.Char('Key', required=True, readonly=True)
+    name = fields.Char('Value', compute='_compute_name')
+    total = fields.Integer('Count', readonly=True, group_operator='sum')
+
+    _sql_constraints = [
+        ('metric_key_uniq', 'unique(metric, key)', 'One counter per metric and value'),
+    ]
+
+    @api.depends('metric', 'key')
+    def _compute_name(self):
+        Datasheet = self.env['sds.datasheet']
+        labels = {
+            'datasheets': {'total': _('All the datasheets')},
+            'hazard': {'hazardous': _('Hazardous'), 'not_hazardous': _('Not hazardous')},
+            'signal': dict(Datasheet._fields['section_2_2_signal']._description_selection(self.env),
+                           none=_('None')),
+            'products': {'with_datasheet': _('With datasheet'), 'without_datasheet': _('Without datasheet')},
+        }
+        for stat in self:
+            stat.name = labels.get(stat.metric, {}).get(stat.key, stat.key)
+
+    @api.model
+    def _count_queries(self):
+        """
+        :return: list of (metric, query), each query selects (key, count) and accepts the %(filter)s
+                 placeholder (condition on the datasheet alias d, or on the product alias p for 'products')
+        """
+        label = self.env['sds.datasheet']._fields['section_2_2_pictograms']
+        return [
+            ('datasheets', """
+                SELECT 'total', count(*) FROM sds_datasheet d WHERE TRUE %(filter)s
+            """),
+            ('hazard', """
+                SELECT CASE WHEN d.section_2_1_selector THEN 'not_hazardous' ELSE 'hazardous' END, count(*)
+                FROM sds_datasheet d WHERE TRUE %(filter)s
+                GROUP BY 1
+            """),
+            ('signal', """
+                SELECT COALESCE(d.section_2_2_signal, 'none'), count(*)
+                FROM sds_datasheet d WHERE TRUE %(filter)s
+                GROUP BY 1
+            """),
+            ('pictogram', """
+                SELECT pic.name, count(*)
+                FROM sds_datasheet d
+                JOIN {rel} lp ON lp.{ds} = d.id
+                JOIN sds_pictogram pic ON pic.id = lp.{pic}
+                WHERE TRUE %(filter)s
+                GROUP BY 1
+            """.format(rel=label.relation, ds=label.column1, pic=label.column2)),
+            ('revision_year', """
+                SELECT EXTRACT(YEAR FROM d.revision_date)::int::varchar, count(*)
+                FROM sds_datasheet d WHERE d.revision_date IS NOT NULL %(filter)s
+                GROUP BY 1
+            """),
+            ('products', """
+                SELECT CASE WHEN EXISTS (SELECT 1 FROM sds_datasheet d WHERE d.product_id = p.id)
+                            THEN 'with_datasheet' ELSE 'without_datasheet' END, count(*)
+                FROM product_template p WHERE p.active %(filter)s
+                GROUP BY 1
+            """),
+        ]
+
+    @api.model
+    def _counts(self, datasheet_ids=None, product_ids=None):
+        """
+        :param datasheet_ids: datasheets counted, all of them if None
+        :param product_ids: products counted, all of them if None
+        :return: dictionary {(metric, key): count}
+        """
+        counts = {}
+        for metric, query in self._count_queries():
+            ids = product_ids if metric == 'products' else datasheet_ids
+            alias = 'p' if metric == 'products' else 'd'
+            if ids is None:
+                row_filter = ''
+            else:
+                ids = [res_id for res_id in ids if res_id]
+                if not ids:
+                    continue
+                row_filter = 'AND %s.id = ANY(%%(ids)s)' % alias
+            self.env.cr.execute(query.replace('%(filter)s', row_filter), {'ids': ids})
+            for key, count in self.env.cr.fetchall():
+                counts[(metric, key)] = count
+        return counts
+
+    @api.model
+    def _update(self, before, after):
+        """
+        Add the differences between two results of _counts to the counters
+        """
+        delta = {}
+        for key in set(before) | set(after):
+            difference = after.get(key, 0) - before.get(key, 0)
+            if difference:
+                delta[key] = difference
+        if not delta:
+            return
+        keys = list(delta)
+        self.env.cr.execute("""
+            INSERT INTO sds_dashboard_stat (metric, key, total, create_uid, create_date, write_uid, write_date)
+            SELECT metric, key, total, %(uid)s, now() AT TIME ZONE 'UTC', %(uid)s, now() AT TIME ZONE 'UTC'
+            FROM unnest(%(metrics)s::varchar[], %(keys)s::varchar[], %(counts)s::int[]) AS stat(metric, key, total)
+            ON CONFLICT (metric, key) DO UPDATE
+            SET total = sds_dashboard_stat.total + EXCLUDED.total, write_uid = EXCLUDED.write_uid,
+                write_date = EXCLUDED.write_date
+        """, {
+            'uid': self.env.uid,
+            'metrics': [metric for metric, key in keys],
+            'keys': [key for metric, key in keys],
+            'counts': [delta[key] for key in keys],
+        })
+        self.invalidate_cache()
+
+    @api.model
+    def rebuild(self):
+        """
+        Recompute all the counters from the datasheets and the products (at every install/upgrade, and
+        after changes made with SQL)
+        :return: number of counters
+        """
+        self.env.cr.execute("DELETE FROM sds_dashboard_stat")
+        counts = self._counts()
+        self._update({}, counts)
+        _logger.info("Compliance dashboard: %d counters rebuilt", len(counts))
+        return len(counts)
+
+    @api.model
+    def get_dashboard(self, years=5):
+        """
+        Values of the compliance dashboard
+        :param years: age of the revisions counted as old
+        :return: dictionary {metric: {key: count}} of the counters, with the additional keys
+                 'revision_older' (number of datasheets revised more than years ago) and
+                 'products_without_datasheet'
+        """
+        self.check_access_rights('read')
+        self.env.cr.execute("SELECT metric, key, total FROM sds_dashboard_stat WHERE total != 0")
+        result = {metric: {} for metric, label in self.METRICS}
+        for metric, key, count in self.env.cr.fetchall():
+            result[metric][key] = count
+        limit = fields.Date.context_today(self).year - years
+        result['revision_older'] = sum(count for year, count in result['revision_year'].items() if int(year) < limit)
+        result['products_without_datasheet'] = result['products'].get('without_datasheet', 0)
+        return result
+
+    @api.model
+    def action_rebuild(self):
+        self.rebuild()
+        return self.env.ref('safety_datasheet.action_dashboard_stat').read()[0]
+
+
+class ProductTemplate(models.Model):
+    _inherit = 'product.template'
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        products = super(ProductTemplate, self).create(vals_list)
+        self.env['sds.dashboard.stat']._update({}, self.env['sds.dashboard.stat']._counts([], products.ids))
+        return products
+
+    @api.multi
+    def write(self, vals):
+        if 'active' not in vals:
+            return super(ProductTemplate, self).write(vals)
+        Stat = self.env['sds.dashboard.stat']
+        before = Stat._counts([], self.ids)
+        result = super(ProductTemplate, self).write(vals)
+        Stat._update(before, Stat._counts([], self.ids))
+        return result
+
+    @api.multi
+    def unlink(self):
+        Stat = self.env['sds.dashboard.stat']
+        before = Stat._counts([], self.ids)
+        result = super(ProductTemplate, self).unlink()
+        Stat._update(before, {})
+        return result
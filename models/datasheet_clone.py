@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+
+import logging
+import time
+
+from odoo import models, api, _
+from odoo.exceptions import UserError
+
+_logger = logging.getLogger(__name__)
+
+# lines of the master datasheet copied with it (the ORM copy() skips section_2_1 and section_3_2)
+CLONE_ONE2MANY = ('section_2_1', 'section_3_2', 'exposure_limit_ids')
+# many2many whose lines belong to the datasheet: the lines are copied instead of being shared
+CLONE_OWNED_MANY2MANY = ('section_9_1',)
+
+
+class SdsDatasheetClone(models.AbstractModel):
+    """
+    Copy of a master datasheet (one per formulation) onto many products (packaging sizes, brands).
+    Instead of calling copy() once per product, every table is copied with a single INSERT ... SELECT for
+    all the products: the datasheets, the lines of section 2.1, 3.2, 8.1 and 9.1, the relation tables of
+    the many2many fields and the translations. The ids of the copies are reserved in advance from the
+    sequences, so the lines are linked to their copy without reading anything back.
+    """
+    _name = "sds.datasheet.clone"
+    _description = "Bulk copy of a datasheet"
+
+    @api.model
+    def clone_datasheet(self, master_id, product_ids, overrides=None):
+        """
+        :param master_id: id of the datasheet to copy
+        :param product_ids: ids of the product.template getting a copy, one copy per product
+        :param overrides: {product id: {field name: value}} of values of the copies (e.g. 'section_1_1'),
+                          only for the fields stored in a column of sds.datasheet. By default the name is
+                          '<product> SDS' and section 1.1 the name of the product, as set by product_id_change
+        :return: sds.datasheet recordset of the copies, in the order of product_ids
+        """
+        Datasheet = self.env['sds.datasheet']
+        Datasheet.check_access_rights('create')
+        master = Datasheet.browse(master_id)
+        master.check_access_rule('read')
+        products = self.env['product.template'].browse(product_ids).exists()
+        if not products:
+            return Datasheet
+        start = time.time()
+        overrides = overrides or {}
+        names = set()
+        for product_overrides in overrides.values():
+            names.update(product_overrides)
+        unknown = [fname for fname in names
+                   if fname not in Datasheet._fields or not Datasheet._fields[fname].column_type]
+        if unknown:
+            raise UserError(_("These fields cannot be set on the copies: %s") % ', '.join(sorted(unknown)))
+
+        Stat = self.env['sds.dashboard.stat']
+        before = Stat._counts([], products.ids)
+
+        targets = []
+        for product in products:
+            values = {'product_id': product.id, 'name': '%s SDS' % product.name, 'section_1_1': product.name}
+            for fname in names - set(values):
+                values[fname] = Datasheet._fields[fname].convert_to_write(master[fname], master)
+            values.update(overrides.get(product.id, {}))
+            targets.append((master.id, values))
+        clone_ids = self._clone_rows(Datasheet, targets)
+
+        # lines of the datasheet, e.g. the classification of section 2.1
+        for fname in CLONE_ONE2MANY:
+            field = Datasheet._fields[fname]
+            Line = self.env[field.comodel_name]
+            line_ids = Line.search([(field.inverse_name, '=', master.id)], order='id').ids
+            self._clone_rows(Line, [(line_id, {field.inverse_name: clone_id})
+                                    for clone_id in clone_ids for line_id in line_ids])
+
+        for fname, field in Datasheet._fields.items():
+            if field.type != 'many2many' or not field.store:
+                continue
+            if fname in CLONE_OWNED_MANY2MANY:
+                # a copy of the lines for every datasheet, then the relation to the copies
+                line_ids = master[fname].ids
+                pairs = [(clone_id, line_id) for clone_id in clone_ids for line_id in line_ids]
+                new_line_ids = self._clone_rows(self.env[field.comodel_name],
+                                                [(line_id, {}) for clone_id, line_id in pairs])
+                self.env.cr.execute("""
+                    INSERT INTO {rel} ({col1}, {col2})
+                    SELECT * FROM unnest(%s::int[], %s::int[])
+                """.format(rel=field.relation, col1=field.column1, col2=field.column2),
+                                    ([clone_id for clone_id, line_id in pairs], new_line_ids))
+            elif field.copy:
+                self.env.cr.execute("""
+                    INSERT INTO {rel} ({col1}, {col2})
+                    SELECT clone.id, rel.{col2}
+                    FROM {rel} rel, unnest(%s::int[]) AS clone(id)
+                    WHERE rel.{col1} = %s
+                """.format(rel=field.relation, col1=field.column1, col2=field.column2), (clone_ids, master.id))
+
+        self.env.invalidate_all()
+        clones = Datasheet.browse(clone_ids)
+        # counters of the compliance dashboard and usage of the sentences, as done by create()
+        Stat._update(before, Stat._counts(clone_ids, products.ids))
+        Sentences = self.env['sds.sentences']
+        Sentences._update_usage({}, Sentences._usage(clone_ids, Sentences._datasheet_fields()))
+        _logger.info("Datasheet %s copied onto %d products in %.2fs", master.id, len(clone_ids), time.time() - start)
+        return clones
+
+    @api.model
+    def _clone_rows(self, Model, targets):
+        """
+        Copy rows of Model and their translations with one INSERT for each table
+        :param targets: list of (source id, {field name: value}), one for each copy; the values replace the
+                        ones of the source and all the targets have the same field names
+        :return: ids of the copies, in the order of targets
+        """
+        if not targets:
+            return []
+        cr = self.env.cr
+        cr.execute("SELECT nextval(%s) FROM generate_series(1, %s)", ('%s_id_seq' % Model._table, len(targets)))
+        new_ids = [row[0] for row in cr.fetchall()]
+        override_names = list(targets[0][1])
+        columns = [fname for fname, field in Model._fields.items()
+                   if field.store and field.column_type and fname not in models.LOG_ACCESS_COLUMNS
+                   and fname != 'id' and fname not in override_names]
+        arrays = [new_ids, [source_id for source_id, values in targets]]
+        casts = ['int4', 'int4']
+        for fname in override_names:
+            field = Model._fields[fname]
+            column = [values[fname] for source_id, values in targets]
+            if field.type != 'boolean':
+                # empty values of the ORM (False) are NULL in the columns, e.g. an empty many2one or char
+                column = [None if value is False else value for value in column]
+            arrays.append(column)
+            casts.append(field.column_type[1])
+        cr.execute("""
+            INSERT INTO "{table}" (id, {columns}, create_uid, create_date, write_uid, write_date)
+            SELECT target.id, {values}, %s, now() AT TIME ZONE 'UTC', %s, now() AT TIME ZONE 'UTC'
+            FROM unnest({arrays}) AS target(id, source_id{names})
+            JOIN "{table}" source ON source.id = target.source_id
+            ORDER BY target.id
+        """.format(
+            table=Model._table,
+            columns=', '.join('"%s"' % fname for fname in columns + override_names),
+            values=', '.join(['source."%s"' % fname for fname in columns] +
+                             ['target."%s"' % fname for fname in override_names]),
+            arrays=', '.join('%%s::%s[]' % cast for cast in casts),
+            names=''.join(', "%s"' % fname for fname in override_names),
+        ), [self.env.uid, self.env.uid] + arrays)
+
+        translated = ['%s,%s' % (Model._name, fname) for fname, field in Model._fields.items()
+                      if field.translate and field.store and fname not in override_names]
+        if translated:
+            cr.execute("""
+                INSERT INTO ir_translation (name, lang, res_id, src, type, value, module, state, comments)
+                SELECT t.name, t.lang, target.id, t.src, t.type, t.value, t.module, t.state, t.comments
+                FROM unnest(%s::int[], %s::int[]) AS target(id, source_id)
+                JOIN ir_translation t ON t.res_id = target.source_id
+                WHERE t.type IN ('model', 'model_terms') AND t.name = ANY(%s)
+            """, (arrays[0], arrays[1], translated))
+        return new_ids
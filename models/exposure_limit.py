@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+
+from odoo import models, fields, api
+from odoo.tools import sql
+
+
+class SdsExposureLimit(models.Model):
+    """
+    Control parameters of section 8.1: occupational exposure limits (TLV), Derived No Effect Levels (DNEL)
+    and Predicted No Effect Concentrations (PNEC), one value per row.
+    The values are stored as numbers with their unit, so that they can be compared across the catalogue
+    (e.g. the datasheets with a long-term exposure limit below 1 mg/m³, see get_datasheets_below) with
+    an index range scan instead of reading the HTML tables of every datasheet.
+    """
+    _name = "sds.exposure.limit"
+    _description = "Exposure limit value"
+    _order = "datasheet_id, limit_type, substance_id, sequence, id"
+
+    LIMIT_TYPES = [('tlv', 'Occupational exposure limit (TLV)'),
+                   ('dnel', 'Derived No Effect Level (DNEL)'),
+                   ('pnec', 'Predicted No Effect Concentration (PNEC)')]
+    DURATIONS = [('long', 'Long-term'), ('short', 'Short-term')]
+    POPULATIONS = [('workers', 'Workers'), ('consumers', 'Consumers')]
+    EFFECTS = [('systemic', 'Systemic effects'), ('local', 'Local effects')]
+    ROUTES = [('inhalation', 'Inhalation'), ('dermal', 'Dermal'), ('oral', 'Oral')]
+    COMPARTMENTS = [('freshwater', 'Freshwater'),
+                    ('freshwater_intermittent', 'Intermittent releases (freshwater)'),
+                    ('marine', 'Marine water'),
+                    ('marine_intermittent', 'Intermittent releases (marine water)'),
+                    ('stp', 'Sewage treatment plant (STP)'),
+                    ('sediment_freshwater', 'Sediment (freshwater)'),
+                    ('sediment_marine', 'Sediment (marine water)'),
+                    ('air', 'Air'),
+                    ('soil', 'Soil'),
+                    ('secondary_poisoning', 'Secondary poisoning')]
+    UNITS = [('mg_m3', 'mg/m³'), ('ppm', 'ppm'), ('f_ml', 'f/ml'), ('mg_kg_bw_day', 'mg/kg bw/day'),
+             ('mg_cm2', 'mg/cm²'), ('mg_l', 'mg/l'), ('ug_l', 'µg/l'), ('mg_kg', 'mg/kg')]
+
+    datasheet_id = fields.Many2one('sds.datasheet', 'Datasheet', required=True, index=True, ondelete='cascade')
+    substance_id = fields.Many2one('sds.chemical.substances', 'Substance', index=True,
+                                   help='Leave empty when the value refers to the whole mixture')
+    sequence = fields.Integer('Sequence', default=10)
+    limit_type = fields.Selection(LIMIT_TYPES, 'Type', required=True, default='tlv')
+    duration = fields.Selection(DURATIONS, 'Exposure', help='TLV: LTEL/STEL; DNEL: long-term/acute effects')
+    population = fields.Selection(POPULATIONS, 'Population', help='DNEL only')
+    effect = fields.Selection(EFFECTS, 'Effects', help='DNEL only')
+    route = fields.Selection(ROUTES, 'Route', help='DNEL only')
+    compartment = fields.Selection(COMPARTMENTS, 'Compartment', help='PNEC only')
+    region = fields.Char('Region', help='TLV only, e.g. EU, IT, FR')
+    legislation = fields.Char('Legislation', help='TLV only, e.g. Directive (EU) 2017/164')
+    value = fields.Float('Value', required=True, digits=(16, 6))
+    unit = fields.Selection(UNITS, 'Unit', required=True)
+    skin = fields.Boolean('Skin designation')
+    date_from = fields.Date('Effective date')
+    date_to = fields.Date('Expiration date')
+    note = fields.Char('Notes', translate=True)
+
+    @api.model_cr
+    def init(self):
+        # range queries on the values of a kind of limit, e.g. TLV long-term in mg/m³ below 1
+        sql.create_index(self._cr, 'sds_exposure_limit_value_index', self._table,
+                         ['limit_type', 'unit', 'duration', 'value'])
+
+    @api.model
+    def get_datasheets_below(self, value, unit='mg_m3', limit_type='tlv', duration='long'):
+        """
+        Datasheets with at least one limit lower than value, e.g. the products containing a substance
+        with a long-term exposure limit below 1 mg/m³: get_datasheets_below(1.0)
+        No conversion between units is done (e.g. ppm and mg/m³ depend on the molar mass).
+        :param value: upper bound (excluded)
+        :param unit: one of UNITS
+        :param limit_type: one of LIMIT_TYPES
+        :param duration: one of DURATIONS, or None for any duration
+        :return: sds.datasheet recordset
+        """
+        self.check_access_rights('read')
+        query = """
+            SELECT DISTINCT datasheet_id FROM sds_exposure_limit
+            WHERE limit_type = %s AND unit = %s AND value < %s
+        """
+        params = [limit_type, unit, value]
+        if duration:
+            query += " AND duration = %s"
+            params.append(duration)
+        self.env.cr.execute(query, params)
+        datasheet_ids = [row[0] for row in self.env.cr.fetchall()]
+        return self.env['sds.datasheet'].search([('id', 'in', datasheet_ids)])
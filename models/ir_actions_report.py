@@ -0,0 +1,19 @@
+# -*- coding: utf-8 -*-
+
+from odoo import models, api
+
+
+class IrActionsReport(models.Model):
+    _inherit = 'ir.actions.report'
+
+    @api.multi
+    def get_paperformat(self):
+        """
+        The GHS labels report has one paper format for each label size (see sds.label.wizard)
+        """
+        size = self._context.get('ghs_label_size')
+        if size and self.report_name == 'safety_datasheet.report_ghs_label':
+            paperformat = self.env.ref('safety_datasheet.paperformat_ghs_label_%s' % size, raise_if_not_found=False)
+            if paperformat:
+                return paperformat
+        return super(IrActionsReport, self).get_paperformat()
@@ -0,0 +1,23 @@
+# -*- coding: utf-8 -*-
+
+from odoo import models, api
+
+
+class IrModuleModule(models.Model):
+    _inherit = 'ir.module.module'
+
+    @api.multi
+    def _update_translations(self, filter_lang=None):
+        """
+        The translations of the regulation reference data are not in i18n/: load them in bulk
+        after the module translations (see sds.regulation.dataset)
+        """
+        res = super(IrModuleModule, self)._update_translations(filter_lang=filter_lang)
+        if 'safety_datasheet' in self.mapped('name'):
+            if not filter_lang:
+                filter_lang = self.env['res.lang'].search([('translatable', '=', True)]).mapped('code')
+            elif not isinstance(filter_lang, (list, tuple)):
+                filter_lang = [filter_lang]
+            self.env['sds.regulation.dataset'].load_translations(filter_lang,
+                                                                force=bool(self._context.get('overwrite')))
+        return res
@@ -1,7 +1,81 @@
 # -*- coding: utf-8 -*-
 
-from odoo import models, fields, api, _
+import re
+
+from lxml import etree
+
+from odoo import models, fields, api, tools, _
 from odoo.osv import expression
+from odoo.tools import pycompat, sql
+
+from .dashboard import DASHBOARD_FIELDS
+
+SIGNAL_WORDS = [('danger', 'Danger'), ('warning', 'Warning')]
+# templates of the SDS report which can be rendered on their own (see reports/report_sds.xml)
+PREVIEW_SECTIONS = ['title'] + ['section_%d' % section for section in range(1, 17)]
+# fields of sds.hazard.statement read by _label_elements_map
+LABEL_ELEMENTS_FIELDS = ('code', 'signal_word', 'pictogram_ids', 'precautionary_ids')
+# quantities of the numeric properties of section 9.1, the values are normalised to the unit in brackets
+PROPERTY_QUANTITIES = [('temperature', 'Temperature (°C)'),
+                       ('pressure', 'Pressure (Pa)'),
+                       ('density', 'Density (g/cm³)'),
+                       ('kinematic_viscosity', 'Kinematic viscosity (mm²/s)'),
+                       ('concentration', 'Concentration (g/l)'),
+                       ('fraction', 'Fraction (%)'),
+                       ('ph', 'pH'),
+                       ('dimensionless', 'Dimensionless')]
+# (code, label, quantity, factor, offset): normalised value = value * factor + offset
+PROPERTY_UNITS = [('c', '°C', 'temperature', 1.0, 0.0),
+                  ('f', '°F', 'temperature', 5.0 / 9.0, -160.0 / 9.0),
+                  ('k', 'K', 'temperature', 1.0, -273.15),
+                  ('pa', 'Pa', 'pressure', 1.0, 0.0),
+                  ('hpa', 'hPa', 'pressure', 100.0, 0.0),
+                  ('kpa', 'kPa', 'pressure', 1000.0, 0.0),
+                  ('mbar', 'mbar', 'pressure', 100.0, 0.0),
+                  ('bar', 'bar', 'pressure', 100000.0, 0.0),
+                  ('mmhg', 'mmHg', 'pressure', 133.322, 0.0),
+                  ('g_cm3', 'g/cm³', 'density', 1.0, 0.0),
+                  ('kg_m3', 'kg/m³', 'density', 0.001, 0.0),
+                  ('mm2_s', 'mm²/s', 'kinematic_viscosity', 1.0, 0.0),
+                  ('m2_s', 'm²/s', 'kinematic_viscosity', 1000000.0, 0.0),
+                  ('g_l', 'g/l', 'concentration', 1.0, 0.0),
+                  ('mg_l', 'mg/l', 'concentration', 0.001, 0.0),
+                  ('percent', '%', 'fraction', 1.0, 0.0),
+                  ('ph', 'pH', 'ph', 1.0, 0.0),
+                  ('none', '-', 'dimensionless', 1.0, 0.0)]
+# spellings of the units found in the values (lower case)
+PROPERTY_UNIT_ALIASES = {'°c': 'c', 'c': 'c', '°f': 'f', 'f': 'f', 'k': 'k',
+                         'pa': 'pa', 'hpa': 'hpa', 'kpa': 'kpa', 'mbar': 'mbar', 'bar': 'bar', 'mmhg': 'mmhg',
+                         'g/cm³': 'g_cm3', 'g/cm3': 'g_cm3', 'g/ml': 'g_cm3', 'kg/l': 'g_cm3',
+                         'kg/m³': 'kg_m3', 'kg/m3': 'kg_m3',
+                         'mm²/s': 'mm2_s', 'mm2/s': 'mm2_s', 'cst': 'mm2_s', 'm²/s': 'm2_s', 'm2/s': 'm2_s',
+                         'g/l': 'g_l', 'mg/l': 'mg_l', '%': 'percent', '% vol': 'percent', '%vol': 'percent',
+                         'ph': 'ph'}
+# unit of the values written without one
+PROPERTY_DEFAULT_UNITS = {'ph': 'ph', 'dimensionless': 'none'}
+# e.g. "> 100 °C", "6,5 - 7,5", "1.013,25 hPa", "1.2 g/cm³ at 20 °C", "1,2 g/cm³ a 20 °C" (the conditions
+# after the unit are ignored, in any language); the numbers are written with either decimal separator
+PROPERTY_NUMBER = r'-?\d+(?:[.,\u00a0 ]\d{3})*(?:[.,]\d+)?'
+PROPERTY_VALUE_RE = re.compile(r'^\s*(?P<operator>[<>]=?|[≤≥])?\s*(?P<low>%s)'
+                               r'(?:\s*(?:-|–|÷|\.\.\.?|to|a|à|bis|tot|hasta|até)\s*(?P<high>%s))?'
+                               r'\s*(?P<unit>[^\s\d(@,;]*(?:\s?vol)?)\s*(?:[@(,;].*|(?<=\s)\D.*)?$'
+                               % (PROPERTY_NUMBER, PROPERTY_NUMBER))
+TYPED_FIELDS = ('value_type', 'value_min', 'value_max', 'unit')
+
+
+def parse_number(text):
+    """
+    :param text: number matched by PROPERTY_NUMBER, e.g. "1.013,25", "1,013.25", "6,5", "1 013"
+    :return: float
+    """
+    text = text.replace('\u00a0', '').replace(' ', '')
+    for separator in ',.':
+        if text.count(separator) > 1:
+            text = text.replace(separator, '')
+    if ',' in text and '.' in text:
+        # the last separator is the decimal one
+        text = text.replace(',' if text.rindex(',') < text.rindex('.') else '.', '')
+    return float(text.replace(',', '.'))
 
 
 class SdsHazardClass(models.Model):
@@ -16,6 +90,31 @@ class SdsHazardClass(models.Model):
 
     name = fields.Char('Category Code', required="True")
     h_class = fields.Char('Hazard Class', required="True", translate=True)
+    signal_word = fields.Selection(SIGNAL_WORDS, string="Signal word")
+    atp_version = fields.Char('ATP version',
+                              help='Adaptation to Technical Progress (or consolidated version) of Regulation (EC) '
+                                   'No 1272/2008 which introduced or last amended this entry')
+    retired = fields.Boolean('Retired', help='No longer part of the regulation reference data')
+
+    # the signal words of the classes are cached with the label elements of the hazard statements
+    @api.model_create_multi
+    def create(self, vals_list):
+        classes = super(SdsHazardClass, self).create(vals_list)
+        self.env['sds.cache.version'].invalidate('label_elements')
+        return classes
+
+    @api.multi
+    def write(self, vals):
+        result = super(SdsHazardClass, self).write(vals)
+        if 'signal_word' in vals:
+            self.env['sds.cache.version'].invalidate('label_elements')
+        return result
+
+    @api.multi
+    def unlink(self):
+        result = super(SdsHazardClass, self).unlink()
+        self.env['sds.cache.version'].invalidate('label_elements')
+        return result
 
 
 class SdsHazardStatement(models.Model):
@@ -34,6 +133,100 @@ class SdsHazardStatement(models.Model):
                                      copy=True)
     code = fields.Char('Hazard Code', required=True)
     name = fields.Char('Description', required=True, translate=True)
+    signal_word = fields.Selection(SIGNAL_WORDS, string="Signal word",
+                                   help='Leave empty when it depends on the hazard category: '
+                                        'the signal word of the hazard class is used')
+    precautionary_ids = fields.Many2many('sds.precautionary.statement', string="Precautionary statements",
+                                         help='Precautionary statements of ANNEX IV for this hazard')
+    atp_version = fields.Char('ATP version',
+                              help='Adaptation to Technical Progress (or consolidated version) of Regulation (EC) '
+                                   'No 1272/2008 which introduced or last amended this entry')
+    retired = fields.Boolean('Retired', help='No longer part of the regulation reference data')
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        statements = super(SdsHazardStatement, self).create(vals_list)
+        self.env['sds.cache.version'].invalidate('label_elements')
+        return statements
+
+    @api.multi
+    def write(self, vals):
+        result = super(SdsHazardStatement, self).write(vals)
+        if any(fname in vals for fname in LABEL_ELEMENTS_FIELDS):
+            self.env['sds.cache.version'].invalidate('label_elements')
+        return result
+
+    @api.multi
+    def unlink(self):
+        result = super(SdsHazardStatement, self).unlink()
+        self.env['sds.cache.version'].invalidate('label_elements')
+        return result
+
+    @api.model
+    def _label_elements_map(self):
+        """
+        Label elements of every hazard statement, loaded once and kept in cache until a hazard
+        statement, class or pictogram is modified (see sds.cache.version).
+        :return: see _label_elements_cache
+        """
+        return self._label_elements_cache(self.env['sds.cache.version'].get_version('label_elements'))
+
+    @api.model
+    @tools.ormcache('version')
+    def _label_elements_cache(self, version):
+        """
+        :return: ({statement id: (code, signal word, pictogram ids, precautionary ids)},
+                  {hazard class id: signal word}, {pictogram id: pictogram name})
+        """
+        pictograms = self._fields['pictogram_ids']
+        precautionary = self._fields['precautionary_ids']
+        cr = self.env.cr
+        cr.execute("""
+            SELECT h.id, h.code, h.signal_word,
+                   ARRAY(SELECT hp.{p_col2} FROM {p_rel} hp WHERE hp.{p_col1} = h.id),
+                   ARRAY(SELECT hp.{s_col2} FROM {s_rel} hp WHERE hp.{s_col1} = h.id)
+            FROM sds_hazard_statement h
+        """.format(p_rel=pictograms.relation, p_col1=pictograms.column1, p_col2=pictograms.column2,
+                   s_rel=precautionary.relation, s_col1=precautionary.column1, s_col2=precautionary.column2))
+        statements = {row[0]: (row[1], row[2], frozenset(row[3]), tuple(row[4])) for row in cr.fetchall()}
+        cr.execute("SELECT id, signal_word FROM sds_hazard_class")
+        classes = dict(cr.fetchall())
+        cr.execute("SELECT id, name FROM sds_pictogram")
+        return statements, classes, dict(cr.fetchall())
+
+    @api.model
+    def _get_label_elements(self, lines, elements=None):
+        """
+        Derive the label elements (section 2.2) from the classification (section 2.1).
+        Signal word: 'Danger' prevails over 'Warning' (CLP Article 20), the hazard class decides when
+        it defines one. Pictograms: union of the statements pictograms, with the precedence rules of
+        CLP Article 26 for GHS07.
+        :param lines: list of (hazard class id, hazard statement id)
+        :param elements: result of _label_elements_map, read once by the callers deriving many datasheets
+        :return: (signal word, pictogram ids, precautionary ids)
+        """
+        statements, classes, pictogram_names = elements or self._label_elements_map()
+        signals = set()
+        codes = set()
+        pictograms = {}
+        ghs07_codes = set()
+        precautionary = []
+        for class_id, statement_id in lines:
+            code, signal, pictogram_ids, p_ids = statements.get(statement_id, (None, False, frozenset(), ()))
+            signals.add(classes.get(class_id) or signal)
+            codes.add(code)
+            for pictogram_id in pictogram_ids:
+                pictograms[pictogram_names[pictogram_id]] = pictogram_id
+                if pictogram_names[pictogram_id] == 'GHS07':
+                    ghs07_codes.add(code)
+            precautionary += [p_id for p_id in p_ids if p_id not in precautionary]
+        if 'GHS07' in pictograms and (
+                'GHS06' in pictograms
+                or ('GHS05' in pictograms and ghs07_codes <= {'H315', 'H319'})
+                or ('H334' in codes and ghs07_codes <= {'H315', 'H317', 'H319'})):
+            del pictograms['GHS07']
+        signal = 'danger' if 'danger' in signals else 'warning' if 'warning' in signals else False
+        return signal, list(pictograms.values()), precautionary
 
     @api.multi
     def name_get(self):
@@ -94,6 +287,10 @@ class SdsPrecautionaryStatement(models.Model):
             ('P4', 'Storage'),
             ('P5', 'Disposal')]
     mode = fields.Selection(MODE)
+    atp_version = fields.Char('ATP version',
+                              help='Adaptation to Technical Progress (or consolidated version) of Regulation (EC) '
+                                   'No 1272/2008 which introduced or last amended this entry')
+    retired = fields.Boolean('Retired', help='No longer part of the regulation reference data')
 
 class SdsPictogram(models.Model):
     """
@@ -106,6 +303,47 @@ class SdsPictogram(models.Model):
     description = fields.Char('Pictogram description', translate=True)
     pictogram = fields.Binary("GHS Pictogram", attachment=True)
 
+    # the images of the labels (_label_image) and the names of the pictograms of the hazard statements
+    # (SdsHazardStatement._label_elements_map) are cached, see sds.cache.version
+    @api.model_create_multi
+    def create(self, vals_list):
+        pictograms = super(SdsPictogram, self).create(vals_list)
+        self.env['sds.cache.version'].invalidate('label_elements')
+        return pictograms
+
+    @api.multi
+    def write(self, vals):
+        result = super(SdsPictogram, self).write(vals)
+        Version = self.env['sds.cache.version']
+        if 'pictogram' in vals:
+            Version.invalidate('label_image')
+        if 'name' in vals:
+            Version.invalidate('label_elements')
+        return result
+
+    @api.multi
+    def unlink(self):
+        result = super(SdsPictogram, self).unlink()
+        Version = self.env['sds.cache.version']
+        Version.invalidate('label_image')
+        Version.invalidate('label_elements')
+        return result
+
+    @api.model
+    @tools.ormcache('pictogram_id', 'size', 'version')
+    def _label_image(self, pictogram_id, size, version):
+        """
+        Pictogram resized for the GHS labels, kept in cache: the same few images are repeated on every label
+        :param size: width/height in pixels
+        :param version: version of the 'label_image' cache (see sds.cache.version)
+        :return: data URI of the image
+        """
+        image = self.browse(pictogram_id).pictogram
+        if not image:
+            return ''
+        image = tools.image_resize_image(image, size=(size, size), avoid_if_small=True)
+        return 'data:image/*;base64,%s' % pycompat.to_text(image)
+
     @api.multi
     def name_get(self):
         if self._context.get('show_description'):
@@ -132,9 +370,11 @@ class SdsRegulationCriteria(models.Model):
     _name = "sds.regulation.criteria"
     _description = "European Community Regulation Criteria"
 
-    datasheet_id = fields.Many2one('sds.datasheet', 'Related Datasheet', copy=True)
-    Classification = fields.Many2one('sds.hazard.class', 'Hazard Class', copy=True)
-    HazardStatement = fields.Many2one('sds.hazard.statement', 'Hazard Statement', copy=True)
+    datasheet_id = fields.Many2one('sds.datasheet', 'Related Datasheet', index=True, copy=True)
+    Classification = fields.Many2one('sds.hazard.class', 'Hazard Class', domain=[('retired', '=', False)],
+                                     copy=True)
+    HazardStatement = fields.Many2one('sds.hazard.statement', 'Hazard Statement', domain=[('retired', '=', False)],
+                                      copy=True)
 
 
 class SdsChemicalClassification(models.Model):
@@ -173,7 +413,7 @@ class SdsChemicalMixture(models.Model):
     _name = "sds.chemical.mixture"
     _description = "Chemical Mixture"
 
-    datasheet_id = fields.Many2one('sds.datasheet', 'Related Datasheet', copy=True)
+    datasheet_id = fields.Many2one('sds.datasheet', 'Related Datasheet', index=True, copy=True)
     substance = fields.Many2one('sds.chemical.substances', 'Chemical name')
     concentration = fields.Char('Concentration Range', translate=True)
 
@@ -183,17 +423,156 @@ class SdsChemicalProperties(models.Model):
     _description = "Physical and chemical properties"
 
     name = fields.Char('Property name', translate=True)
+    quantity = fields.Selection(PROPERTY_QUANTITIES, 'Quantity',
+                                help='Kind of the numeric values of the property, they are normalised to the '
+                                     'unit of the quantity to be compared')
 
 
 class SdsChemicalPropertiesLine(models.Model):
     """
     This class is for physical properties in section 9.1
+    The value is the text printed on the datasheet; the numeric value (or range) is kept in typed fields,
+    filled from the text when it is written (see _parse_value), and normalised to the unit of the quantity
+    in norm_min/norm_max for the range queries (see get_datasheets_in_range).
     """
     _name = "sds.chemical.properties.line"
     _description = "Physical and chemical properties line"
 
+    VALUE_TYPES = [('eq', '='), ('range', 'Range'), ('gt', '>'), ('lt', '<')]
+
     name_id = fields.Many2one('sds.chemical.properties', 'Property', copy=True)
     value = fields.Char('Property value', translate=True)
+    value_type = fields.Selection(VALUE_TYPES, 'Value type', copy=True,
+                                  help='Empty when the value is not numeric (e.g. "n.d.", "liquid")')
+    value_min = fields.Float('Minimum', copy=True, help='Value, lower end of the range or bound of ">"')
+    value_max = fields.Float('Maximum', copy=True, help='Value, upper end of the range or bound of "<"')
+    unit = fields.Selection([(code, label) for code, label, quantity, factor, offset in PROPERTY_UNITS], 'Unit',
+                            copy=True)
+    norm_min = fields.Float('Normalised minimum', compute='_compute_norm', store=True)
+    norm_max = fields.Float('Normalised maximum', compute='_compute_norm', store=True)
+
+    @api.model_cr
+    def init(self):
+        sql.create_index(self._cr, 'sds_chemical_properties_line_norm_index', self._table,
+                         ['name_id', 'norm_min', 'norm_max'])
+
+    @api.depends('value_type', 'value_min', 'value_max', 'unit')
+    def _compute_norm(self):
+        units = {code: (factor, offset) for code, label, quantity, factor, offset in PROPERTY_UNITS}
+        for line in self:
+            factor, offset = units.get(line.unit, (1.0, 0.0))
+            value_min = line.value_max if line.value_type == 'lt' else line.value_min
+            value_max = line.value_min if line.value_type in ('eq', 'gt') else line.value_max
+            line.norm_min = value_min * factor + offset
+            line.norm_max = value_max * factor + offset
+
+    @api.model
+    def _parse_value(self, text, quantity=None):
+        """
+        Numeric value of a property, e.g. "62 °C", "6.5 - 7.5", "> 100 °C", "1,2 g/cm³ at 20 °C"
+        :param text: value as printed on the datasheet
+        :param quantity: quantity of the property, used when the text has no unit (e.g. pH)
+        :return: dictionary of the typed fields, empty if the text is not a numeric value
+        """
+        match = PROPERTY_VALUE_RE.match((text or '').lower())
+        if not match:
+            return {}
+        unit = PROPERTY_UNIT_ALIASES.get(match.group('unit').strip())
+        if not unit:
+            if match.group('unit').strip() or quantity not in PROPERTY_DEFAULT_UNITS:
+                return {}
+            unit = PROPERTY_DEFAULT_UNITS[quantity]
+        units = dict((code, unit_quantity) for code, label, unit_quantity, factor, offset in PROPERTY_UNITS)
+        if quantity and units[unit] != quantity:
+            return {}
+        low = parse_number(match.group('low'))
+        high = match.group('high')
+        operator = match.group('operator')
+        if high:
+            return {'value_type': 'range', 'value_min': low, 'value_max': parse_number(high),
+                    'unit': unit}
+        if operator in ('>', '>=', '≥'):
+            return {'value_type': 'gt', 'value_min': low, 'value_max': 0.0, 'unit': unit}
+        if operator in ('<', '<=', '≤'):
+            return {'value_type': 'lt', 'value_min': 0.0, 'value_max': low, 'unit': unit}
+        return {'value_type': 'eq', 'value_min': low, 'value_max': low, 'unit': unit}
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        quantities = {}
+        for vals in vals_list:
+            if vals.get('value') and vals.get('name_id') and not any(fname in vals for fname in TYPED_FIELDS):
+                if vals['name_id'] not in quantities:
+                    quantities[vals['name_id']] = self.env['sds.chemical.properties'].browse(vals['name_id']).quantity
+                vals.update(self._parse_value(vals['value'], quantities[vals['name_id']]))
+        return super(SdsChemicalPropertiesLine, self).create(vals_list)
+
+    @api.multi
+    def write(self, vals):
+        # as in create, the value written is parsed whatever the language: the numbers and units are the
+        # same in every translation (see PROPERTY_VALUE_RE)
+        if 'value' not in vals or any(fname in vals for fname in TYPED_FIELDS):
+            return super(SdsChemicalPropertiesLine, self).write(vals)
+        for line in self:
+            name = self.env['sds.chemical.properties'].browse(vals['name_id']) if 'name_id' in vals else line.name_id
+            typed = dict.fromkeys(TYPED_FIELDS, False)
+            typed.update(self._parse_value(vals['value'], name.quantity))
+            super(SdsChemicalPropertiesLine, line).write(dict(vals, **typed))
+        return True
+
+    @api.model
+    def parse_values(self, force=False):
+        """
+        Fill the typed fields of the lines which have a value but no value type, i.e. those created
+        before the typed fields were introduced. Called once at upgrade (see data/chemical_properties.xml).
+        :param force: parse the lines again even if it was already done
+        :return: number of lines parsed
+        """
+        config = self.env['ir.config_parameter'].sudo()
+        if not force and config.get_param('safety_datasheet.property_values_parsed'):
+            return 0
+        config.set_param('safety_datasheet.property_values_parsed', '1')
+        lines = self.with_context(lang=None).search([('value_type', '=', False), ('value', '!=', False),
+                                                    ('name_id.quantity', '!=', False)])
+        count = 0
+        for line in lines:
+            typed = self._parse_value(line.value, line.name_id.quantity)
+            if typed:
+                super(SdsChemicalPropertiesLine, line).write(typed)
+                count += 1
+        return count
+
+    @api.model
+    def get_datasheets_in_range(self, property_id, lower=None, upper=None, unit=None):
+        """
+        Datasheets whose value of a property can be within (lower, upper), e.g. the products with a flash
+        point below 60 °C: get_datasheets_in_range(flash_point.id, upper=60, unit='c').
+        A range matches when it overlaps the interval, '> x' and '< x' are open on one side.
+        :param property_id: id of sds.chemical.properties
+        :param lower: lower bound (excluded), None for no bound
+        :param upper: upper bound (excluded), None for no bound
+        :param unit: unit of the bounds, the unit of the quantity of the property when None
+        :return: sds.datasheet recordset
+        """
+        self.check_access_rights('read')
+        units = {code: (factor, offset) for code, label, quantity, factor, offset in PROPERTY_UNITS}
+        factor, offset = units.get(unit, (1.0, 0.0))
+        relation = self.env['sds.datasheet']._fields['section_9_1']
+        query = """
+            SELECT DISTINCT rel.{datasheet} FROM sds_chemical_properties_line l
+            JOIN {relation} rel ON rel.{line} = l.id
+            WHERE l.name_id = %(property)s AND l.value_type IS NOT NULL
+        """.format(relation=relation.relation, datasheet=relation.column1, line=relation.column2)
+        params = {'property': property_id}
+        if lower is not None:
+            query += " AND (l.value_type = 'gt' OR l.norm_max > %(lower)s)"
+            params['lower'] = lower * factor + offset
+        if upper is not None:
+            query += " AND (l.value_type = 'lt' OR l.norm_min < %(upper)s)"
+            params['upper'] = upper * factor + offset
+        self.env.cr.execute(query, params)
+        datasheet_ids = [row[0] for row in self.env.cr.fetchall()]
+        return self.env['sds.datasheet'].search([('id', 'in', datasheet_ids)])
 
 
 class SdsSentences(models.Model):
@@ -226,6 +605,140 @@ class SdsSentences(models.Model):
     sequence = fields.Integer(string='Sequence', default=10)
     name = fields.Char('Statement', translate=True)
     category = fields.Selection(SECTION)
+    retired = fields.Boolean('Retired', help='No longer part of the reference sentences')
+    usage_count = fields.Integer('Used in', readonly=True, copy=False, default=0,
+                                 help='Number of datasheets using the sentence, ranks the sentences of the picker')
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        sentences = super(SdsSentences, self).create(vals_list)
+        self.env['sds.cache.version'].invalidate('picker')
+        return sentences
+
+    @api.multi
+    def write(self, vals):
+        result = super(SdsSentences, self).write(vals)
+        if any(fname in vals for fname in ('name', 'category', 'retired', 'sequence')):
+            self.env['sds.cache.version'].invalidate('picker')
+        return result
+
+    @api.multi
+    def unlink(self):
+        result = super(SdsSentences, self).unlink()
+        self.env['sds.cache.version'].invalidate('picker')
+        return result
+
+    @api.model
+    @tools.ormcache('lang', 'version')
+    def _picker_map(self, lang, version):
+        """
+        Sentences of every category in the language, ranked by usage, loaded once and kept in cache until a
+        sentence is modified or the ranking is refreshed (see rank_sentences)
+        :param version: version of the 'picker' cache (see sds.cache.version)
+        :return: {category: [(sentence id, name)]}
+        """
+        sentences = self.with_context(lang=lang).search_read([('retired', '=', False)], ['category', 'name'],
+                                                             order='usage_count desc, sequence, id')
+        partitions = {}
+        for sentence in sentences:
+            partitions.setdefault(sentence['category'], []).append((sentence['id'], sentence['name'] or ''))
+        return partitions
+
+    @api.model
+    def get_picker(self, category, name='', limit=None):
+        """
+        Sentences proposed to the authors for a category, the most used first, in the language of the user.
+        The ranking is the one of the last refresh of the cache: the usage counts updated by the saves of
+        the datasheets since then (see _update_usage) are taken into account at the next rank_sentences,
+        i.e. up to a day later.
+        :param category: one of SECTION
+        :param name: text to look for in the sentences (case insensitive)
+        :param limit: maximum number of sentences, all of them if None
+        :return: list of (sentence id, name)
+        """
+        self.check_access_rights('read')
+        version = self.env['sds.cache.version'].get_version('picker')
+        sentences = self._picker_map(self.env.lang or 'en_US', version).get(category, [])
+        if name:
+            name = name.lower()
+            sentences = [sentence for sentence in sentences if name in sentence[1].lower()]
+        return sentences[:limit] if limit else list(sentences)
+
+    @api.model
+    def _name_search(self, name, args=None, operator='ilike', limit=100, name_get_uid=None):
+        # the domain of the sentence fields of the datasheet: served by the cached picker
+        domain = [tuple(leaf) if isinstance(leaf, (list, tuple)) else leaf for leaf in args or []]
+        categories = [leaf[2] for leaf in domain if len(leaf) == 3 and leaf[:2] == ('category', '=')]
+        if operator == 'ilike' and len(categories) == 1 and \
+                all(leaf == ('retired', '=', False) or leaf[:2] == ('category', '=') for leaf in domain):
+            return self.get_picker(categories[0], name=name, limit=limit)
+        return super(SdsSentences, self)._name_search(name, args=args, operator=operator, limit=limit,
+                                                      name_get_uid=name_get_uid)
+
+    @api.model
+    def _datasheet_fields(self, field_names=None):
+        """
+        :param field_names: names of sds.datasheet fields, all of them if None
+        :return: the many2many fields of sds.datasheet to the sentences among field_names
+        """
+        datasheet_fields = self.env['sds.datasheet']._fields
+        if field_names is None:
+            field_names = list(datasheet_fields)
+        return [datasheet_fields[fname] for fname in field_names
+                if fname in datasheet_fields and datasheet_fields[fname].type == 'many2many'
+                and datasheet_fields[fname].comodel_name == self._name]
+
+    @api.model
+    def _usage(self, datasheet_ids, datasheet_fields):
+        """
+        :param datasheet_ids: datasheets counted, all of them if None
+        :param datasheet_fields: fields of sds.datasheet counted (see _datasheet_fields)
+        :return: {sentence id: number of uses}
+        """
+        if not datasheet_fields or datasheet_ids is not None and not datasheet_ids:
+            return {}
+        queries = []
+        for field in datasheet_fields:
+            query = 'SELECT {col2} FROM {rel}'.format(rel=field.relation, col2=field.column2)
+            if datasheet_ids is not None:
+                query += ' WHERE {col1} = ANY(%(ids)s)'.format(col1=field.column1)
+            queries.append(query)
+        self.env.cr.execute("""
+            SELECT sentence_id, count(*) FROM ({}) AS used(sentence_id) GROUP BY sentence_id
+        """.format(' UNION ALL '.join(queries)), {'ids': list(datasheet_ids or [])})
+        return dict(self.env.cr.fetchall())
+
+    @api.model
+    def _update_usage(self, before, after):
+        """
+        Add the differences between two results of _usage to the usage counts. The ranking of the cached
+        picker is refreshed by rank_sentences.
+        """
+        delta = {}
+        for sentence_id in set(before) | set(after):
+            difference = after.get(sentence_id, 0) - before.get(sentence_id, 0)
+            if difference:
+                delta[sentence_id] = difference
+        if not delta:
+            return
+        self.env.cr.execute("""
+            UPDATE sds_sentences s SET usage_count = COALESCE(s.usage_count, 0) + used.delta
+            FROM unnest(%s::int[], %s::int[]) AS used(sentence_id, delta)
+            WHERE s.id = used.sentence_id
+        """, (list(delta), list(delta.values())))
+        self.invalidate_cache(['usage_count'], list(delta))
+
+    @api.model
+    def rank_sentences(self):
+        """
+        Recompute the usage counts from all the datasheets and refresh the cached picker (nightly cron)
+        :return: True
+        """
+        self.env.cr.execute("UPDATE sds_sentences SET usage_count = 0 WHERE usage_count IS DISTINCT FROM 0")
+        self._update_usage({}, self._usage(None, self._datasheet_fields()))
+        self.invalidate_cache(['usage_count'])
+        self.env['sds.cache.version'].invalidate('picker')
+        return True
 
 
 class Datasheet(models.Model):
@@ -252,7 +765,7 @@ class Datasheet(models.Model):
         return self.env['res.company']._company_default_get().phone
 
     name = fields.Char(string='Name', required=True, index=True, default=lambda self: _('New SDS'))
-    product_id = fields.Many2one('product.template', 'Product', required=True, copy=True)
+    product_id = fields.Many2one('product.template', 'Product', required=True, copy=True, index=True)
     revision_date = fields.Date(string="Revision date", default=fields.Date.today(), required=True)
     supersedes_date = fields.Char(string="Supersedes version/date", translate=True)
 
@@ -273,8 +786,9 @@ class Datasheet(models.Model):
                                   help='Regulation (EC) No 1272/2008 - classification, labelling and packaging of substances and mixtures (CLP)')
     section_2_2_selector = fields.Boolean(string="GHS Labelling not necessary", default=True)
     section_2_2_pictograms = fields.Many2many('sds.pictogram', string="Label pictograms", copy=True)
-    section_2_2_signal = fields.Selection([('danger', 'Danger'), ('warning', 'Warning')], string="SignalWords")
-    section_2_2_P = fields.Many2many('sds.precautionary.statement', string="Precautionary Statement", copy=True)
+    section_2_2_signal = fields.Selection(SIGNAL_WORDS, string="SignalWords")
+    section_2_2_P = fields.Many2many('sds.precautionary.statement', string="Precautionary Statement",
+                                     domain=[('retired', '=', False)], copy=True)
     section_2_2_Additional = fields.Html('Additional Labelling', translate=True)
     section_2_3_PBT = fields.Char(string="PBT",
                                   help="persistent, bioaccumulative and toxic substances (PBT substances)",
@@ -300,19 +814,24 @@ class Datasheet(models.Model):
 
     # Section 4: First aid measures
     section_4_1_general = fields.Many2many('sds.sentences', relation="sds_general_firstaid_statement_rel",
-                                           domain="[('category', '=', 'general')]", string='General advice',
+                                           domain="[('category', '=', 'general'), ('retired', '=', False)]",
+                                           string='General advice',
                                            context={'default_category': 'general'})
     section_4_1_inhalation = fields.Many2many('sds.sentences', relation="sds_inhalation_firstaid_statement_rel",
-                                              domain="[('category', '=', 'inhalation')]", string='Inhalation',
+                                              domain="[('category', '=', 'inhalation'), ('retired', '=', False)]",
+                                              string='Inhalation',
                                               context={'default_category': 'inhalation'})
     section_4_1_skin = fields.Many2many('sds.sentences', relation="sds_skin_firstaid_statement_rel",
-                                        domain="[('category', '=', 'skin')]", string='Skin contact',
+                                        domain="[('category', '=', 'skin'), ('retired', '=', False)]",
+                                        string='Skin contact',
                                         context={'default_category': 'skin'})
     section_4_1_eye = fields.Many2many('sds.sentences', relation="sds_eye_firstaid_statement_rel",
-                                       domain="[('category', '=', 'eye')]", string='Eye contact',
+                                       domain="[('category', '=', 'eye'), ('retired', '=', False)]",
+                                       string='Eye contact',
                                        context={'default_category': 'eye'})
     section_4_1_ingestion = fields.Many2many('sds.sentences', relation="sds_ingestion_firstaid_statement_rel",
-                                             domain="[('category', '=', 'ingestion')]", string='Ingestion',
+                                             domain="[('category', '=', 'ingestion'), ('retired', '=', False)]",
+                                             string='Ingestion',
                                              context={'default_category': 'ingestion'})
 
     section_4_2 = fields.Html(string="Most important symptoms and effects, both acute and delayed",
@@ -326,18 +845,19 @@ class Datasheet(models.Model):
 
     # Section 5: Firefighting measures
     section_5_1_1 = fields.Many2many('sds.sentences', relation="sds_extinguishing_statement_rel",
-                                     domain="[('category', '=', 'extinguishing')]", string='Extinguishing media',
+                                     domain="[('category', '=', 'extinguishing'), ('retired', '=', False)]",
+                                     string='Extinguishing media',
                                      context={'default_category': 'extinguishing'})
     section_5_1_2 = fields.Many2many('sds.sentences', relation="sds_non_suitable_extinguishing_statement_rel",
-                                     domain="[('category', '=', 'extinguishing')]",
+                                     domain="[('category', '=', 'extinguishing'), ('retired', '=', False)]",
                                      string='Unsuitable extinguishing media',
                                      context={'default_category': 'extinguishing'})
     section_5_2 = fields.Many2many('sds.sentences', relation="sds_combustion_products_statement_rel",
-                                   domain="[('category', '=', 'fire_hazards')]",
+                                   domain="[('category', '=', 'fire_hazards'), ('retired', '=', False)]",
                                    string='Special hazards arising from the substance or mixture',
                                    context={'default_category': 'fire_hazards'})
     section_5_3 = fields.Many2many('sds.sentences', relation="sds_fire_fighting_statement_rel",
-                                   domain="[('category', '=', 'fire_fight_advice')]",
+                                   domain="[('category', '=', 'fire_fight_advice'), ('retired', '=', False)]",
                                    string='Advice for firefighters',
                                    context={'default_category': 'fire_fight_advice'})
     section_5_note = fields.Html(string="Section 5 notes", translate=True)
@@ -345,19 +865,19 @@ class Datasheet(models.Model):
     # Section 6: Accidental release measures
 
     section_6_1_1 = fields.Many2many('sds.sentences', relation="sds_protective_equipment_statement_rel",
-                                     domain="[('category', '=', 'protective')]",
+                                     domain="[('category', '=', 'protective'), ('retired', '=', False)]",
                                      string='Personal precautions for non-emergency personnel',
                                      context={'default_category': 'protective'})
     section_6_1_2 = fields.Many2many('sds.sentences', relation="sds_protective_responders_equipment_statement_rel",
-                                     domain="[('category', '=', 'protective')]",
+                                     domain="[('category', '=', 'protective'), ('retired', '=', False)]",
                                      string='Personal precautions for emergency responders',
                                      context={'default_category': 'protective'})
     section_6_2 = fields.Many2many('sds.sentences', relation="sds_env_precaution_statement_rel",
-                                   domain="[('category', '=', 'env_precaution')]",
+                                   domain="[('category', '=', 'env_precaution'), ('retired', '=', False)]",
                                    string='Environmental precautions',
                                    context={'default_category': 'env_precaution'})
     section_6_3 = fields.Many2many('sds.sentences', relation="sds_containment_methods_statement_rel",
-                                   domain="[('category', '=', 'containment')]",
+                                   domain="[('category', '=', 'containment'), ('retired', '=', False)]",
                                    string='Methods and materials for containment and cleaning up',
                                    context={'default_category': 'containment'})
     section_6_4 = fields.Html(string="Reference to other sections",
@@ -367,19 +887,19 @@ class Datasheet(models.Model):
 
     # Section 7: Handling and storage
     section_7_1 = fields.Many2many('sds.sentences', relation="sds_safe_handling_statement_rel",
-                                   domain="[('category', '=', 'handling')]",
+                                   domain="[('category', '=', 'handling'), ('retired', '=', False)]",
                                    string='Precautions for safe handling',
                                    context={'default_category': 'handling'})
     section_7_2_1 = fields.Many2many('sds.sentences', relation="sds_safe_storage_statement_rel",
-                                     domain="[('category', '=', 'storage')]",
+                                     domain="[('category', '=', 'storage'), ('retired', '=', False)]",
                                      string='Conditions for safe storage, including any incompatibilities',
                                      context={'default_category': 'storage'})
     section_7_2_2 = fields.Many2many('sds.sentences', relation="sds_not_store_with_statement_rel",
-                                     domain="[('category', '=', 'store_products')]",
+                                     domain="[('category', '=', 'store_products'), ('retired', '=', False)]",
                                      string='Do not store with the following product types',
                                      context={'default_category': 'store_products'})
     section_7_2_3 = fields.Many2many('sds.sentences', relation="sds_unsuitable_containers_statement_rel",
-                                     domain="[('category', '=', 'store_products')]",
+                                     domain="[('category', '=', 'store_products'), ('retired', '=', False)]",
                                      string='Unsuitable materials for containers',
                                      context={'default_category': 'store_products'})
     section_7_3 = fields.Html(string="Specific end use",
@@ -491,32 +1011,36 @@ class Datasheet(models.Model):
                                             '<tbody><tr><td>Secondary poisoning</td><td>-</td></tr></tbody>'
                                         '</table></div></div>'),
                                    translate=True, sanitize=False)
+    exposure_limit_ids = fields.One2many('sds.exposure.limit', 'datasheet_id', string='Exposure limits',
+                                         copy=True,
+                                         help='When there are values of a type (TLV, DNEL, PNEC), the report '
+                                              'prints them instead of the corresponding table above')
     section_8_2_1 = fields.Many2many('sds.sentences', relation="sds_engineer_control_statement_rel",
-                                     domain="[('category', '=', 'engineer_control')]",
+                                     domain="[('category', '=', 'engineer_control'), ('retired', '=', False)]",
                                      string='Appropriate engineering controls',
                                      context={'default_category': 'engineer_control'})
     section_8_2_2 = fields.Many2many('sds.sentences', relation="sds_eye_protection_statement_rel",
-                                     domain="[('category', '=', 'eye_protection')]",
+                                     domain="[('category', '=', 'eye_protection'), ('retired', '=', False)]",
                                      string='Eye/face protection',
                                      context={'default_category': 'eye_protection'})
     section_8_2_3_1 = fields.Many2many('sds.sentences', relation="sds_skin_hand_protection_statement_rel",
-                                       domain="[('category', '=', 'skin_protection')]",
+                                       domain="[('category', '=', 'skin_protection'), ('retired', '=', False)]",
                                        string='Skin Protection - Hand',
                                        context={'default_category': 'skin_protection'})
     section_8_2_3_2 = fields.Many2many('sds.sentences', relation="sds_skin_other_protection_statement_rel",
-                                       domain="[('category', '=', 'skin_protection')]",
+                                       domain="[('category', '=', 'skin_protection'), ('retired', '=', False)]",
                                        string='Skin Protection - Other',
                                        context={'default_category': 'skin_protection'})
     section_8_2_4 = fields.Many2many('sds.sentences', relation="sds_respiratory_protection_statement_rel",
-                                     domain="[('category', '=', 'respiratory')]",
+                                     domain="[('category', '=', 'respiratory'), ('retired', '=', False)]",
                                      string='Respiratory protection',
                                      context={'default_category': 'respiratory'})
     section_8_2_5 = fields.Many2many('sds.sentences', relation="sds_thermal_hazards_statement_rel",
-                                     domain="[('category', '=', 'thermal')]",
+                                     domain="[('category', '=', 'thermal'), ('retired', '=', False)]",
                                      string='Thermal hazards',
                                      context={'default_category': 'thermal'})
     section_8_3 = fields.Many2many('sds.sentences', relation="sds_env_exposure_statement_rel",
-                                   domain="[('category', '=', 'env_exposure')]",
+                                   domain="[('category', '=', 'env_exposure'), ('retired', '=', False)]",
                                    string='Environmental exposure controls',
                                    context={'default_category': 'env_exposure'})
     section_8_note = fields.Html(string="Section 8 notes", translate=True)
@@ -531,42 +1055,42 @@ class Datasheet(models.Model):
 
     # Section 10: Stability and reactivity
     section_10_1 = fields.Many2many('sds.sentences', relation="sds_reactivity_statement_rel",
-                                    domain="[('category', '=', 'reactivity')]",
+                                    domain="[('category', '=', 'reactivity'), ('retired', '=', False)]",
                                     string='Reactivity',
                                     context={'default_category': 'reactivity'})
     section_10_2 = fields.Many2many('sds.sentences', relation="sds_stability_statement_rel",
-                                    domain="[('category', '=', 'stability')]",
+                                    domain="[('category', '=', 'stability'), ('retired', '=', False)]",
                                     string='Chemical stability',
                                     context={'default_category': 'stability'})
     section_10_3 = fields.Many2many('sds.sentences', relation="sds_hazardous_reaction_statement_rel",
-                                    domain="[('category', '=', 'haz_reaction')]",
+                                    domain="[('category', '=', 'haz_reaction'), ('retired', '=', False)]",
                                     string='Possibility of hazardous reactions',
                                     context={'default_category': 'haz_reaction'})
     section_10_4 = fields.Many2many('sds.sentences', relation="sds_avoid_condition_statement_rel",
-                                    domain="[('category', '=', 'avoid_condition')]",
+                                    domain="[('category', '=', 'avoid_condition'), ('retired', '=', False)]",
                                     string='Conditions to avoid',
                                     context={'default_category': 'avoid_condition'})
     section_10_5 = fields.Many2many('sds.sentences', relation="sds_incompatible_materials_statement_rel",
-                                    domain="[('category', '=', 'incompatible')]",
+                                    domain="[('category', '=', 'incompatible'), ('retired', '=', False)]",
                                     string='Incompatible materials',
                                     context={'default_category': 'incompatible'})
     section_10_6 = fields.Many2many('sds.sentences', relation="sds_decomposition_products_statement_rel",
-                                    domain="[('category', '=', 'decomposition')]",
+                                    domain="[('category', '=', 'decomposition'), ('retired', '=', False)]",
                                     string='Hazardous decomposition products',
                                     context={'default_category': 'decomposition'})
     section_10_note = fields.Html(string="Section 10 Notes")
 
     # Section 11: Toxicological information
     section_11_1_1_oral = fields.Many2many('sds.sentences', relation="sds_acute_oral_toxicity_statement_rel",
-                                           domain="[('category', '=', 'toxicity')]",
+                                           domain="[('category', '=', 'toxicity'), ('retired', '=', False)]",
                                            string='Acute oral toxicity',
                                            context={'default_category': 'toxicity'})
     section_11_1_1_dermal = fields.Many2many('sds.sentences', relation="sds_acute_dermal_toxicity_statement_rel",
-                                             domain="[('category', '=', 'toxicity')]",
+                                             domain="[('category', '=', 'toxicity'), ('retired', '=', False)]",
                                              string='Acute dermal toxicity',
                                              context={'default_category': 'toxicity'})
     section_11_1_1_inhalation = fields.Many2many('sds.sentences', relation="sds_acute_inhalation_toxicity_statement_rel",
-                                                 domain="[('category', '=', 'toxicity')]",
+                                                 domain="[('category', '=', 'toxicity'), ('retired', '=', False)]",
                                                  string='Acute inhalation toxicity',
                                                  context={'default_category': 'toxicity'})
     section_11_1_1_selector = fields.Boolean(string="Insert acute toxicity details", default=False)
@@ -583,25 +1107,25 @@ class Datasheet(models.Model):
                                             '</tbody></table>'),
                                       translate=True, sanitize=False)
     section_11_1_2 = fields.Many2many('sds.sentences', relation="sds_skin_corrosion_statement_rel",
-                                      domain="[('category', '=', 'skin_corrosion')]",
+                                      domain="[('category', '=', 'skin_corrosion'), ('retired', '=', False)]",
                                       string='Skin corrosion/irritation',
                                       context={'default_category': 'skin_corrosion'})
     section_11_1_2_selector = fields.Boolean(string="Insert skin corrosion/irritation details", default=False)
     section_11_1_2_text = fields.Html(string="Skin corrosion/irritation details", translate=True, sanitize=False)
     section_11_1_3 = fields.Many2many('sds.sentences', relation="sds_eye_damage_statement_rel",
-                                      domain="[('category', '=', 'eye_damage')]",
+                                      domain="[('category', '=', 'eye_damage'), ('retired', '=', False)]",
                                       string='Serious eye damage/eye irritation',
                                       context={'default_category': 'eye_damage'})
     section_11_1_3_selector = fields.Boolean(string="Insert eye damage corrosion/irritation details", default=False)
     section_11_1_3_text = fields.Html(string="Eye damage/irritation details", translate=True,sanitize=False)
     section_11_1_4 = fields.Many2many('sds.sentences', relation="sds_respiratory_skin_sensitization_statement_rel",
-                                      domain="[('category', '=', 'sensitization')]",
+                                      domain="[('category', '=', 'sensitization'), ('retired', '=', False)]",
                                       string='Respiratory or skin sensitization',
                                       context={'default_category': 'sensitization'})
     section_11_1_4_selector = fields.Boolean(string="Insert respiratory or skin sensitization details", default=False)
     section_11_1_4_text = fields.Html(string="Respiratory or skin sensitization details", translate=True,sanitize=False)
     section_11_1_5 = fields.Many2many('sds.sentences', relation="sds_mutagenicity_statement_rel",
-                                      domain="[('category', '=', 'mutagenicity')]",
+                                      domain="[('category', '=', 'mutagenicity'), ('retired', '=', False)]",
                                       string='Germ cell mutagenicity',
                                       context={'default_category': 'mutagenicity'})
     section_11_1_5_selector = fields.Boolean(string="Insert mutagenicity details", default=False)
@@ -612,31 +1136,31 @@ class Datasheet(models.Model):
                                           '<tbody><tr><td><br></td><td><br></td><td><br></td></tr></tbody></table>'),
                                       translate=True,sanitize=False)
     section_11_1_6 = fields.Many2many('sds.sentences', relation="sds_carcinogenicity_statement_rel",
-                                      domain="[('category', '=', 'carcinogenicity')]",
+                                      domain="[('category', '=', 'carcinogenicity'), ('retired', '=', False)]",
                                       string='Carcinogenicity',
                                       context={'default_category': 'carcinogenicity'})
     section_11_1_6_selector = fields.Boolean(string="Insert carcinogenicity details", default=False)
     section_11_1_6_text = fields.Html(string="Carcinogenicity details", translate=True,sanitize=False)
     section_11_1_7 = fields.Many2many('sds.sentences', relation="sds_reproductive_toxicity_statement_rel",
-                                      domain="[('category', '=', 'reproductive')]",
+                                      domain="[('category', '=', 'reproductive'), ('retired', '=', False)]",
                                       string='Reproductive toxicity',
                                       context={'default_category': 'reproductive'})
     section_11_1_7_selector = fields.Boolean(string="Insert reproductive toxicity details", default=False)
     section_11_1_7_text = fields.Html(string="Reproductive toxicity details", translate=True,sanitize=False)
     section_11_1_8 = fields.Many2many('sds.sentences', relation="sds_specific_target_single_statement_rel",
-                                      domain="[('category', '=', 'STOST')]",
+                                      domain="[('category', '=', 'STOST'), ('retired', '=', False)]",
                                       string='Specific Target Organ Systemic Toxicity (Single Exposure)',
                                       context={'default_category': 'STOST'})
     section_11_1_8_selector = fields.Boolean(string="Insert STOST SE details", default=False)
     section_11_1_8_text = fields.Html(string="STOST SE details", translate=True,sanitize=False)
     section_11_1_9 = fields.Many2many('sds.sentences', relation="sds_specific_target_repeated_statement_rel",
-                                      domain="[('category', '=', 'STOST')]",
+                                      domain="[('category', '=', 'STOST'), ('retired', '=', False)]",
                                       string='Specific Target Organ Systemic Toxicity (Repeated Exposure)',
                                       context={'default_category': 'STOST'})
     section_11_1_9_selector = fields.Boolean(string="Insert STOST RE details", default=False)
     section_11_1_9_text = fields.Html(string="STOST RE details", translate=True,sanitize=False)
     section_11_1_10 = fields.Many2many('sds.sentences', relation="sds_aspiration_hazard_products_statement_rel",
-                                       domain="[('category', '=', 'aspiration')]",
+                                       domain="[('category', '=', 'aspiration'), ('retired', '=', False)]",
                                        string='Aspiration Hazard',
                                        context={'default_category': 'aspiration'})
     section_11_1_10_selector = fields.Boolean(string="Insert aspiration Hazard details", default=False)
@@ -648,7 +1172,8 @@ class Datasheet(models.Model):
 
     # Section 12: Ecological information
     section_12_1 = fields.Many2many('sds.sentences', relation="sds_toxicity_statement_rel",
-                                    domain="[('category', '=', 'ecotoxicity')]", string='Toxicity',
+                                    domain="[('category', '=', 'ecotoxicity'), ('retired', '=', False)]",
+                                    string='Toxicity',
                                     context={'default_category': 'ecotoxicity'})
     section_12_1_text = fields.Html(string="Toxicity details",
                                     default=lambda s:_(
@@ -658,35 +1183,40 @@ class Datasheet(models.Model):
                                     ),
                                     translate=True, sanitize=False)
     section_12_2 = fields.Many2many('sds.sentences', relation="sds_persistence_statement_rel",
-                                    domain="[('category', '=', 'persistence')]", string='Persistence and degradability',
+                                    domain="[('category', '=', 'persistence'), ('retired', '=', False)]",
+                                    string='Persistence and degradability',
                                     context={'default_category': 'persistence'})
     section_12_2_text = fields.Html(string="Persistence and degradability details", translate=True, sanitize=False)
     section_12_3 = fields.Many2many('sds.sentences', relation="sds_bioaccumulative_potential_statement_rel",
-                                    domain="[('category', '=', 'bioaccumulative')]", string='Bioaccumulative potential',
+                                    domain="[('category', '=', 'bioaccumulative'), ('retired', '=', False)]",
+                                    string='Bioaccumulative potential',
                                     context={'default_category': 'bioaccumulative'})
     section_12_3_text = fields.Html(string="Bioaccumulative potential details", translate=True, sanitize=False)
     section_12_4 = fields.Many2many('sds.sentences', relation="sds_mobility_soil_statement_rel",
-                                    domain="[('category', '=', 'mobility')]", string='Mobility in soil',
+                                    domain="[('category', '=', 'mobility'), ('retired', '=', False)]",
+                                    string='Mobility in soil',
                                     context={'default_category': 'mobility'})
     section_12_4_text = fields.Html(string="Mobility in soil details", translate=True, sanitize=False)
     section_12_5 = fields.Many2many('sds.sentences', relation="sds_pbt_vpvb_statement_rel",
-                                    domain="[('category', '=', 'pbtvpvb')]",
+                                    domain="[('category', '=', 'pbtvpvb'), ('retired', '=', False)]",
                                     string='Results of PBT and vPvB assessment',
                                     context={'default_category': 'pbtvpvb'})
     section_12_5_text = fields.Html(string="Results of PBT and vPvB assessment details", translate=True, sanitize=False)
     section_12_6 = fields.Many2many('sds.sentences', relation="sds_endocrine_disrupting_statement_rel",
-                                    domain="[('category', '=', 'endocrine')]", string='Endocrine disrupting properties',
+                                    domain="[('category', '=', 'endocrine'), ('retired', '=', False)]",
+                                    string='Endocrine disrupting properties',
                                     context={'default_category': 'endocrine'})
     section_12_6_text = fields.Html(string="Endocrine disrupting properties details", translate=True, sanitize=False)
     section_12_7 = fields.Many2many('sds.sentences', relation="sds_other_adverse_statement_rel",
-                                    domain="[('category', '=', 'adverse')]", string='Other adverse effects',
+                                    domain="[('category', '=', 'adverse'), ('retired', '=', False)]",
+                                    string='Other adverse effects',
                                     context={'default_category': 'adverse'})
     section_12_7_text = fields.Html(string="Other adverse effects details", translate=True, sanitize=False)
     section_12_note = fields.Html(string="Section 12 Notes", translate=True)
 
     # Section 13: Disposal considerations
     section_13_1 = fields.Many2many('sds.sentences', relation="sds_disposal_consideration_statement_rel",
-                                    domain="[('category', '=', 'disposal')]",
+                                    domain="[('category', '=', 'disposal'), ('retired', '=', False)]",
                                     string='Waste treatment methods',
                                     context={'default_category': 'disposal'})
     section_13_note = fields.Html(string="Section 13 Notes", translate=True)
@@ -706,6 +1236,10 @@ class Datasheet(models.Model):
     section_14_7 = fields.Char('Maritime transport in bulk according to IMO instruments',
                                default=lambda s: _("Bulk transport in tankers is not intended."), translate=True)
     section_14_note = fields.Html(string="Section 14 Notes", translate=True)
+    un_entry_id = fields.Many2one('sds.un.entry', 'UN entry', index=True, domain=[('retired', '=', False)],
+                                  help='Entry of the dangerous goods list: fills 14.1-14.5 in all the languages')
+    # search of the datasheets by transport class, e.g. '3' (not '2.3' nor a UN entry)
+    un_hazard_class = fields.Char('Transport class', related='un_entry_id.hazard_class', readonly=True)
 
     # Section 15: Regulatory Information
     section_15_1_ozone = fields.Char(string="Regulation (EC) No 2037/2000 on substances that deplete the ozone layer",
@@ -801,6 +1335,51 @@ class Datasheet(models.Model):
         result = self.update(vals)
         return result
 
+    @api.multi
+    @api.onchange('un_entry_id')
+    def un_entry_id_change(self):
+        """
+        Fill the transport information (section 14) according to the UN entry
+        :return:
+        """
+        if self.un_entry_id:
+            self.update(self._transport_values(self.un_entry_id))
+
+    @api.model
+    def _transport_values(self, entry):
+        """
+        :param entry: sds.un.entry, in the language of the values
+        :return: values of the section 14 fields
+        """
+        hazard_class = entry.hazard_class
+        if entry.subsidiary_risk:
+            hazard_class += ' (%s)' % entry.subsidiary_risk
+        values = {
+            'section_14_1': 'UN %s' % entry.un_number,
+            'section_14_2': entry.name,
+            'section_14_3': hazard_class,
+            'section_14_4': entry.packing_group or _("Not applicable."),
+            # also when the previous entry was environmentally hazardous
+            'section_14_5': _("Environmentally hazardous.") if entry.environmental_hazard
+            else _("Not Hazardous to the environment."),
+        }
+        return values
+
+    @api.multi
+    def fill_transport_information(self):
+        """
+        Write the transport information of the UN entry in all the installed languages, with the proper
+        shipping name translated in the reference data
+        :return: True
+        """
+        langs = [code for code, name in self.env['res.lang'].get_installed()]
+        for entry in self.mapped('un_entry_id'):
+            datasheets = self.filtered(lambda datasheet: datasheet.un_entry_id == entry)
+            for lang in langs:
+                datasheets = datasheets.with_context(lang=lang)
+                datasheets.write(datasheets._transport_values(entry.with_context(lang=lang)))
+        return True
+
     @api.multi
     @api.onchange('section_2_1_selector')
     def section_2_1_selector_change(self):
@@ -817,6 +1396,209 @@ class Datasheet(models.Model):
         result = self.update(vals)
         return result
 
+    @api.multi
+    @api.onchange('section_2_1')
+    def section_2_1_change(self):
+        """
+        Fill the label elements (section 2.2) according to the classification (section 2.1)
+        :return:
+        """
+        if self.section_2_1_selector or not self.section_2_1:
+            return
+        lines = [(line.Classification.id, line.HazardStatement.id) for line in self.section_2_1]
+        signal, pictogram_ids, precautionary_ids = self.env['sds.hazard.statement']._get_label_elements(lines)
+        self.update({
+            'section_2_2_selector': False,
+            'section_2_2_signal': signal,
+            'section_2_2_pictograms': [(6, 0, pictogram_ids)],
+            'section_2_2_P': [(6, 0, precautionary_ids)],
+        })
+
+    @api.multi
+    def fill_label_elements(self):
+        """
+        Batch version of section_2_1_change, e.g. to relabel many datasheets after a reclassification.
+        The classification of all the datasheets is read at once and the datasheets getting the
+        same label elements are written together.
+        :return: True
+        """
+        hazardous = self.filtered(lambda datasheet: not datasheet.section_2_1_selector)
+        if not hazardous:
+            return True
+        lines = {}
+        self.env.cr.execute("""SELECT datasheet_id, "Classification", "HazardStatement"
+                               FROM sds_regulation_criteria WHERE datasheet_id IN %s ORDER BY id""",
+                            (tuple(hazardous.ids),))
+        for datasheet_id, class_id, statement_id in self.env.cr.fetchall():
+            lines.setdefault(datasheet_id, []).append((class_id, statement_id))
+        groups = {}
+        Statement = self.env['sds.hazard.statement']
+        elements = Statement._label_elements_map()
+        for datasheet_id, datasheet_lines in lines.items():
+            signal, pictogram_ids, precautionary_ids = Statement._get_label_elements(datasheet_lines, elements)
+            key = (signal, tuple(sorted(pictogram_ids)), tuple(sorted(precautionary_ids)))
+            groups.setdefault(key, []).append(datasheet_id)
+        for (signal, pictogram_ids, precautionary_ids), datasheet_ids in groups.items():
+            self.browse(datasheet_ids).write({
+                'section_2_2_selector': False,
+                'section_2_2_signal': signal,
+                'section_2_2_pictograms': [(6, 0, pictogram_ids)],
+                'section_2_2_P': [(6, 0, precautionary_ids)],
+            })
+        return True
+
+    @api.multi
+    def _get_label_data(self, langs, image_size):
+        """
+        Content of the GHS labels: product identifier, pictograms, signal word, H and P statements
+        and supplier. For each language the datasheets and their statements are read in batch.
+        :param langs: list of language codes
+        :param image_size: size of the pictograms in pixels
+        :return: list of dictionaries, one label per datasheet and language
+        """
+        Pictogram = self.env['sds.pictogram']
+        image_version = self.env['sds.cache.version'].get_version('label_image')
+        labels = {}
+        for lang in langs:
+            datasheets = self.with_context(lang=lang)
+            signals = dict(self._fields['section_2_2_signal']._description_selection(datasheets.env))
+            for datasheet in datasheets:
+                label = {
+                    'lang': lang,
+                    'product': datasheet.section_1_1,
+                    'supplier': datasheet.section_1_3,
+                    'pictograms': [],
+                    'signal': '',
+                    'hazards': [],
+                    'precautions': [],
+                }
+                if not datasheet.section_2_2_selector:
+                    label.update({
+                        'pictograms': [Pictogram._label_image(pictogram.id, image_size, image_version)
+                                       for pictogram in datasheet.section_2_2_pictograms],
+                        'signal': signals.get(datasheet.section_2_2_signal, ''),
+                        'hazards': ['%s %s' % (statement.code, statement.name)
+                                    for statement in datasheet.section_2_1.mapped('HazardStatement')],
+                        'precautions': ['%s %s' % (statement.name, statement.description)
+                                        for statement in datasheet.section_2_2_P],
+                    })
+                labels[datasheet.id, lang] = label
+        return [labels[datasheet.id, lang] for datasheet in self for lang in langs]
+
+    @api.multi
+    def render_ghs_labels(self, langs, size='a7', copies=1):
+        """
+        PDF of the GHS labels of the datasheets, e.g. to feed a printer queue
+        :param langs: list of language codes
+        :param size: label size, see sds.label.wizard
+        :param copies: number of copies of each label
+        :return: PDF content
+        """
+        data = {'ids': self.ids, 'model': self._name, 'langs': langs, 'size': size, 'copies': copies}
+        report = self.env.ref('safety_datasheet.ghs_label_report').with_context(ghs_label_size=size)
+        pdf, report_format = report.render_qweb_pdf(self.ids, data=data)
+        return pdf
+
+    @api.multi
+    def render_preview(self, lang, section=None):
+        """
+        HTML preview of the datasheet, rendered with the templates of the PDF report but without wkhtmltopdf
+        :param lang: language code
+        :param section: one of PREVIEW_SECTIONS to render only that section, None for the whole datasheet
+        :return: HTML
+        """
+        self.ensure_one()
+        if section and section not in PREVIEW_SECTIONS:
+            raise ValueError("Unknown datasheet section %r" % section)
+        template = 'safety_datasheet.report_sds_%s' % section if section else 'safety_datasheet.report_sds_preview'
+        values = {
+            'doc': self.env['sds.report.data'].get_datasheets(self.ids, lang)[0],
+            'doc_lang': lang,
+            'sections': PREVIEW_SECTIONS,
+        }
+        return self.env['ir.ui.view'].with_context(lang=lang).render_template(template, values)
+
+    @api.model
+    def fields_view_get(self, view_id=None, view_type='form', toolbar=False, submenu=False):
+        """
+        With 'sds_section' in the context (e.g. action_sds), the form contains only the fields of that section:
+        the other sections are edited in a dialog (see action_open_section), so opening a datasheet reads
+        one section and not the relations and translations of all the 16 sections.
+        """
+        result = super(Datasheet, self).fields_view_get(view_id=view_id, view_type=view_type, toolbar=toolbar,
+                                                        submenu=submenu)
+        section = self.env.context.get('sds_section')
+        if view_type == 'form' and section and result['model'] == self._name:
+            result['arch'], result['fields'] = self._section_form_arch(
+                result['arch'], result['fields'], str(section), self.env.context.get('sds_section_dialog'))
+        return result
+
+    @api.model
+    def _section_form_arch(self, arch, view_fields, section, dialog):
+        """
+        :param arch: form arch, as returned by fields_view_get
+        :param view_fields: fields of the arch, as returned by fields_view_get
+        :param section: number of the section to keep
+        :param dialog: True for the form of the section alone, False for the whole form where the pages of
+                       the other sections only have a button opening them
+        :return: (arch, fields) of the form
+        """
+        root = etree.fromstring(arch)
+        pages = root.xpath("//notebook/page[starts-with(@name, 'section')]")
+        active = [page for page in pages if page.get('name') == 'section%s' % section]
+        if not active:
+            return arch, view_fields
+        if dialog:
+            form = etree.Element('form', string=root.get('string', ''))
+            sheet = etree.SubElement(form, 'sheet')
+            sheet.extend(list(active[0]))
+            removed = [node for node in root.iter('field')]
+            root = form
+        else:
+            removed = []
+            for page in pages:
+                if page is active[0]:
+                    continue
+                removed += list(page.iter('field'))
+                for child in list(page):
+                    page.remove(child)
+                page_section = page.get('name')[len('section'):]
+                etree.SubElement(page, 'button', {
+                    'type': 'object',
+                    'name': 'action_open_section',
+                    'string': _('Edit section %s') % page_section,
+                    'class': 'btn-primary',
+                    'context': "{'sds_section': '%s'}" % page_section,
+                    'modifiers': '{}',
+                })
+        kept = set(node.get('name') for node in root.iter('field'))
+        # the selectors of the removed sections stay in the form, hidden, for the modifiers and onchanges
+        sheet = root.find('sheet')
+        for name in sorted(set(node.get('name') for node in removed) - kept):
+            if self._fields[name].type in ('boolean', 'selection'):
+                etree.SubElement(sheet, 'field', {'name': name, 'invisible': '1', 'modifiers': '{"invisible": true}'})
+                kept.add(name)
+        view_fields = {name: value for name, value in view_fields.items() if name in kept}
+        return etree.tostring(root, encoding='unicode'), view_fields
+
+    @api.multi
+    def action_open_section(self):
+        """Call when button 'Edit section' clicked: open the section of the context in a dialog.
+               """
+        self.ensure_one()
+        section = self.env.context.get('sds_section')
+        return {
+            'type': 'ir.actions.act_window',
+            'name': _('%s - section %s') % (self.display_name, section),
+            'res_model': self._name,
+            'res_id': self.id,
+            'view_mode': 'form',
+            'views': [(self.env.ref('safety_datasheet.safety_datasheet_view_form').id, 'form')],
+            'target': 'new',
+            'context': dict(self.env.context, sds_section=section, sds_section_dialog=True,
+                            form_view_initial_mode='edit'),
+        }
+
     @api.multi
     def xlate_default(self,ids=False):
         """
@@ -866,8 +1648,47 @@ class Datasheet(models.Model):
 
     @api.model
     def create(self, vals):
+        Stat = self.env['sds.dashboard.stat']
+        before = Stat._counts([], [vals.get('product_id')])
         result = super(Datasheet, self).create(vals)
         self.xlate_default(result.ids)
+        Stat._update(before, Stat._counts(result.ids, [vals.get('product_id')]))
+        Sentences = self.env['sds.sentences']
+        Sentences._update_usage({}, Sentences._usage(result.ids, Sentences._datasheet_fields(list(result._fields))))
+        if vals.get('un_entry_id'):
+            result.fill_transport_information()
+        return result
+
+    @api.multi
+    def write(self, vals):
+        # counters of the compliance dashboard, see sds.dashboard.stat
+        counted = any(fname in vals for fname in DASHBOARD_FIELDS)
+        if counted:
+            Stat = self.env['sds.dashboard.stat']
+            product_ids = self.mapped('product_id').ids + [vals.get('product_id')]
+            before = Stat._counts(self.ids, product_ids)
+        # usage of the sentences, ranking the sentence picker
+        Sentences = self.env['sds.sentences']
+        sentence_fields = Sentences._datasheet_fields(list(vals))
+        usage = Sentences._usage(self.ids, sentence_fields)
+        result = super(Datasheet, self).write(vals)
+        if counted:
+            Stat._update(before, Stat._counts(self.ids, product_ids))
+        Sentences._update_usage(usage, Sentences._usage(self.ids, sentence_fields))
+        if vals.get('un_entry_id'):
+            self.fill_transport_information()
+        return result
+
+    @api.multi
+    def unlink(self):
+        Stat = self.env['sds.dashboard.stat']
+        product_ids = self.mapped('product_id').ids
+        before = Stat._counts(self.ids, product_ids)
+        Sentences = self.env['sds.sentences']
+        usage = Sentences._usage(self.ids, Sentences._datasheet_fields())
+        result = super(Datasheet, self).unlink()
+        Stat._update(before, Stat._counts([], product_ids))
+        Sentences._update_usage(usage, {})
         return result
 
     @api.multi
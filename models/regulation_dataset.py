@@ -0,0 +1,216 @@
+# -*- coding: utf-8 -*-
+
+import csv
+import hashlib
+import io
+import logging
+
+from odoo import models, api, tools
+from odoo.modules import get_module_resource
+from odoo.tools.translate import PoFileReader
+
+_logger = logging.getLogger(__name__)
+
+MODULE = 'safety_datasheet'
+
+
+class SdsRegulationDataset(models.AbstractModel):
+    """
+    Loader for the regulation reference data (hazard classes, H/EUH and P statements, action sentences,
+    UN dangerous goods entries).
+    Each dataset is a CSV file in data/regulation/ whose 'id' column is the XML id of the record.
+    The incoming set is compared with the database and only the differences are applied:
+    new codes are created, changed ones are updated and codes no longer in the file are flagged
+    as retired (they are never deleted, because datasheets may still refer to them).
+    When a new Adaptation to Technical Progress (ATP) of Regulation (EC) No 1272/2008 is published,
+    edit the CSV files (setting the atp_version column of the new/amended rows) and upgrade the module.
+    The translations of these records are kept in data/regulation/i18n/ instead of i18n/ and are
+    inserted with a few set-based statements per language (see load_translations).
+    """
+    _name = "sds.regulation.dataset"
+    _description = "Regulation reference data loader"
+
+    # (dataset, model, fields read from the CSV file)
+    DATASETS = [
+        ('hazard_class', 'sds.hazard.class', ['name', 'h_class', 'signal_word', 'atp_version']),
+        ('precautionary_statement', 'sds.precautionary.statement', ['name', 'description', 'mode', 'atp_version']),
+        ('hazard_statement', 'sds.hazard.statement',
+         ['code', 'name', 'pictogram_ids', 'signal_word', 'precautionary_ids', 'atp_version']),
+        ('sentences', 'sds.sentences', ['name', 'category']),
+        ('un_entry', 'sds.un.entry',
+         ['un_number', 'name', 'hazard_class', 'subsidiary_risk', 'packing_group', 'environmental_hazard',
+          'atp_version']),
+    ]
+
+    @api.model
+    def _xmlid_map(self, model):
+        """
+        :return: dictionary {xml id name: res_id} of the records of model defined by this module
+        """
+        self.env.cr.execute("SELECT name, res_id FROM ir_model_data WHERE module = %s AND model = %s",
+                            (MODULE, model))
+        return dict(self.env.cr.fetchall())
+
+    @api.model
+    def load_datasets(self, force=False):
+        """
+        Called at every install/upgrade (see data/regulation_dataset.xml).
+        Datasets whose file did not change since the last load are skipped.
+        :param force: compare the dataset with the database even if the file did not change
+        :return: True
+        """
+        for name, model, field_names in self.DATASETS:
+            self._load_dataset(name, model, field_names, force=force)
+        return True
+
+    @api.model
+    def _load_dataset(self, name, model, field_names, force=False):
+        with tools.file_open('%s/data/regulation/%s.csv' % (MODULE, name), 'rb') as csv_file:
+            content = csv_file.read()
+        rows = list(csv.DictReader(io.StringIO(content.decode('utf-8'))))
+        existing = self._xmlid_map(model)
+
+        # the records are not loaded by the XML loader: tell the module cleanup they are still
+        # part of the module, otherwise they would be deleted at the end of the upgrade
+        self.pool.loaded_xmlids.update('%s.%s' % (MODULE, xmlid) for xmlid in existing)
+        self.pool.loaded_xmlids.update('%s.%s' % (MODULE, row['id']) for row in rows)
+
+        checksum = hashlib.sha1(content).hexdigest()
+        param = 'safety_datasheet.dataset_%s' % name
+        config = self.env['ir.config_parameter'].sudo()
+        if not force and config.get_param(param) == checksum:
+            return
+
+        Model = self.env[model].with_context(lang=None)
+        model_fields = Model._fields
+        refs = {fname: self._xmlid_map(model_fields[fname].comodel_name)
+                for fname in field_names if model_fields[fname].type == 'many2many'}
+        current = {values['id']: values
+                   for values in Model.browse(list(existing.values())).read(field_names + ['retired'])}
+
+        to_create = []
+        # {changes: (vals changed, [res_id])}: the records with the same changes are written together,
+        # e.g. the atp_version of all the codes amended by an ATP
+        to_update = {}
+        for row in rows:
+            vals = {'retired': False}
+            for fname in field_names:
+                value = row.get(fname) or False
+                if fname in refs:
+                    value = [refs[fname][xmlid] for xmlid in (value or '').split()]
+                elif model_fields[fname].type == 'boolean':
+                    value = value in ('1', 'True', 'true')
+                vals[fname] = value
+            res_id = existing.get(row['id'])
+            if res_id not in current:
+                to_create.append((row['id'], vals))
+            else:
+                changes = self._changes(current[res_id], vals, refs)
+                if changes:
+                    key = tuple(sorted((fname, tuple(value) if isinstance(value, list) else value)
+                                       for fname, value in changes.items()))
+                    to_update.setdefault(key, (changes, []))[1].append(res_id)
+        incoming = set(row['id'] for row in rows)
+        to_retire = [res_id for xmlid, res_id in existing.items()
+                     if xmlid not in incoming and res_id in current and not current[res_id]['retired']]
+
+        if to_create:
+            records = Model.create([self._m2m_commands(vals, refs) for xmlid, vals in to_create])
+            self.env['ir.model.data'].create([{
+                'module': MODULE,
+                'name': xmlid,
+                'model': model,
+                'res_id': record.id,
+                'noupdate': False,
+            } for (xmlid, vals), record in zip(to_create, records)])
+            self.env['ir.model.data'].clear_caches()
+        for changes, res_ids in to_update.values():
+            Model.browse(res_ids).write(self._m2m_commands(changes, refs))
+        if to_retire:
+            Model.browse(to_retire).write({'retired': True})
+
+        config.set_param(param, checksum)
+        _logger.info("Dataset %s: %d created, %d updated, %d retired",
+                     name, len(to_create), sum(len(res_ids) for changes, res_ids in to_update.values()),
+                     len(to_retire))
+
+    @api.model
+    def _changes(self, values, vals, refs):
+        """
+        :return: the values of vals which differ from the ones read from the database
+        """
+        changes = {}
+        for fname, value in vals.items():
+            if fname in refs:
+                if set(values[fname]) != set(value):
+                    changes[fname] = value
+            elif (values[fname] or False) != value:
+                changes[fname] = value
+        return changes
+
+    @api.model
+    def _m2m_commands(self, vals, refs):
+        return dict(vals, **{fname: [(6, 0, vals[fname])] for fname in refs if fname in vals})
+
+    @api.model
+    def load_translations(self, langs, force=False):
+        """
+        Load the translations of the datasets records, called at install/upgrade and when a language is
+        installed (see ir.module.module). Languages whose files and datasets did not change are skipped.
+        :param langs: list of language codes
+        :param force: load the translations even if nothing changed since the last load
+        :return: True
+        """
+        config = self.env['ir.config_parameter'].sudo()
+        datasets = ''.join(config.get_param('safety_datasheet.dataset_%s' % name) or ''
+                           for name, model, field_names in self.DATASETS)
+        for lang in langs:
+            if lang == 'en_US':
+                continue
+            # same lookup as the module translations: 'it.po' then 'it_IT.po'
+            paths = [get_module_resource(MODULE, 'data', 'regulation', 'i18n', '%s.po' % code)
+                     for code in (lang.split('_')[0], lang)]
+            paths = [path for path in paths if path]
+            if not paths:
+                continue
+            contents = []
+            for path in paths:
+                with tools.file_open(path, 'rb') as po_file:
+                    contents.append(po_file.read())
+            checksum = hashlib.sha1(b''.join(contents) + datasets.encode()).hexdigest()
+            param = 'safety_datasheet.dataset_translations_%s' % lang
+            if not force and config.get_param(param) == checksum:
+                continue
+            count = 0
+            for content in contents:
+                count += self._load_po(lang, content)
+            config.set_param(param, checksum)
+            _logger.info("Dataset translations %s: %d terms loaded", lang, count)
+        self.env['ir.translation'].clear_caches()
+        return True
+
+    @api.model
+    def _load_po(self, lang, content):
+        xmlids = {}
+        rows = {}
+        # one entry per occurrence, e.g. model:sds.hazard.statement,name:safety_datasheet.H200
+        for entry in PoFileReader(io.BytesIO(content)):
+            if entry['type'] != 'model' or entry['module'] != MODULE or not entry['value']:
+                continue
+            model = entry['imd_model']
+            if model not in xmlids:
+                xmlids[model] = self._xmlid_map(model)
+            res_id = xmlids[model].get(entry['imd_name'])
+            if res_id:
+                rows[(entry['name'], res_id)] = (entry['name'], lang, res_id, entry['src'], 'model',
+                                                 entry['value'], MODULE, 'translated')
+        rows = list(rows.values())
+        for chunk in self.env.cr.split_for_in_conditions(rows):
+            self.env.cr.execute("""
+                INSERT INTO ir_translation (name, lang, res_id, src, type, value, module, state)
+                VALUES {}
+                ON CONFLICT (type, lang, name, res_id) WHERE type = 'model'
+                DO UPDATE SET src = EXCLUDED.src, value = EXCLUDED.value, module = EXCLUDED.module,
+                              state = EXCLUDED.state
+            """.format(', '.join(['%s'] * len(chunk))), chunk)
+        return len(rows)
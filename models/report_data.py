@@ -0,0 +1,148 @@
+# -*- coding: utf-8 -*-
+
+from odoo import models, api, tools
+
+# Models read for the SDS report, in dependency order: each model is read once for the whole batch,
+# after all the models pointing to it. The relational fields are followed towards the models listed here.
+REPORT_FIELDS = [
+    ('sds.datasheet', None),  # all the fields
+    ('product.template', ['name']),
+    ('sds.regulation.criteria', ['Classification', 'HazardStatement']),
+    ('sds.chemical.mixture', ['substance', 'concentration']),
+    ('sds.exposure.limit', ['substance_id', 'limit_type', 'duration', 'population', 'effect', 'route',
+                            'compartment', 'region', 'legislation', 'value', 'unit', 'skin', 'date_from',
+                            'date_to', 'note']),
+    ('sds.chemical.substances', ['name', 'IUPACname', 'CASno', 'ECno', 'REACHno', 'Classification']),
+    ('sds.chemical.classification', ['HazardCategories', 'HazardStatement']),
+    ('sds.hazard.class', ['name', 'h_class', 'display_name']),
+    ('sds.hazard.statement', ['code', 'name', 'display_name']),
+    ('sds.precautionary.statement', ['name', 'description']),
+    ('sds.pictogram', ['name', 'pictogram']),
+    ('sds.chemical.properties.line', ['name_id', 'value']),
+    ('sds.chemical.properties', ['name', 'display_name']),
+    ('sds.sentences', ['name']),
+]
+REPORT_MODELS = set(model for model, field_names in REPORT_FIELDS)
+
+
+class ReportRecord(dict):
+    """
+    Values of a record read for a report, whose keys are also readable as attributes in the templates
+    (e.g. doc.section_1_1, line.substance.CASno), like the fields of the record itself
+    """
+
+    def __init__(self, model, values=()):
+        super(ReportRecord, self).__init__(values)
+        # read by the report layouts, e.g. data-oe-model of web.external_layout_standard
+        self._name = model
+
+    def __getattr__(self, name):
+        try:
+            return self[name]
+        except KeyError:
+            if not self and not name.startswith('_'):
+                # empty many2one: all its fields are empty, as for an empty record
+                return False
+            raise AttributeError(name)
+
+
+class SdsReportData(models.AbstractModel):
+    """
+    Builder of the values of the SDS report.
+    The datasheets of a batch and all the records they refer to (classification, mixture components,
+    properties, sentences, ...) are read model by model in the target language, so the number of
+    queries depends on the number of fields and not on the number of datasheets. The templates
+    receive ReportRecord dictionaries instead of records, with the selections, dates and names
+    already rendered.
+    """
+    _name = "sds.report.data"
+    _description = "SDS report values builder"
+
+    @api.model
+    def get_datasheets(self, datasheet_ids, lang, formatted=True):
+        """
+        :param datasheet_ids: list of sds.datasheet ids
+        :param lang: language code of the report
+        :param formatted: render the dates and selections as printed, False to keep the raw values
+        :return: list of ReportRecord, one for each datasheet found, in the order of datasheet_ids
+        """
+        env = self.with_context(lang=lang).env
+        rows = {}
+        pending = {'sds.datasheet': set(datasheet_ids)}
+        for model, field_names in REPORT_FIELDS:
+            ids = pending.pop(model, None)
+            rows[model] = {}
+            if not ids:
+                continue
+            Model = env[model]
+            if field_names is None:
+                field_names = [name for name, field in Model._fields.items()
+                               if field.store and name not in models.MAGIC_COLUMNS]
+            values = Model.browse(sorted(ids)).read(field_names, load=None)
+            for fname in field_names:
+                comodel = Model._fields[fname].comodel_name
+                if comodel in REPORT_MODELS:
+                    ids = pending.setdefault(comodel, set())
+                    for value in values:
+                        ids.update(self._relation_ids(value[fname]))
+            rows[model] = {value['id']: ReportRecord(model, value) for value in values}
+        self._link(env, rows)
+
+        datasheets = rows['sds.datasheet']
+        if formatted:
+            self._format_datasheets(env, lang, list(datasheets.values()))
+            self._format_exposure_limits(env, lang, list(rows['sds.exposure.limit'].values()))
+        return [datasheets[datasheet_id] for datasheet_id in datasheet_ids if datasheet_id in datasheets]
+
+    @api.model
+    def _relation_ids(self, value):
+        if not value:
+            return []
+        return value if isinstance(value, list) else [value]
+
+    @api.model
+    def _link(self, env, rows):
+        """
+        Replace the ids of the relational fields with the ReportRecord of the related records
+        (an empty ReportRecord for an empty many2one, as an empty record would be)
+        """
+        for model, records in rows.items():
+            Model = env[model]
+            relational = [(fname, field.comodel_name, field.type)
+                          for fname, field in Model._fields.items()
+                          if field.comodel_name in REPORT_MODELS]
+            for record in records.values():
+                for fname, comodel, ftype in relational:
+                    if fname not in record:
+                        continue
+                    related = rows[comodel]
+                    if ftype == 'many2one':
+                        record[fname] = related.get(record[fname]) or ReportRecord(comodel)
+                    else:
+                        record[fname] = [related[res_id] for res_id in record[fname] if res_id in related]
+
+    @api.model
+    def _format_datasheets(self, env, lang, datasheets):
+        signals = dict(env['sds.datasheet']._fields['section_2_2_signal']._description_selection(env))
+        for datasheet in datasheets:
+            datasheet['revision_date'] = tools.format_date(env, datasheet['revision_date'], lang_code=lang,
+                                                           date_format='d MMMM y')
+            datasheet['section_2_2_signal'] = signals.get(datasheet['section_2_2_signal'], '')
+            # tables of section 8.1, see sds.exposure.limit
+            exposure_limits = {limit_type: [] for limit_type, label in env['sds.exposure.limit'].LIMIT_TYPES}
+            for limit in datasheet['exposure_limit_ids']:
+                exposure_limits[limit['limit_type']].append(limit)
+            datasheet['exposure_limits'] = exposure_limits
+
+    @api.model
+    def _format_exposure_limits(self, env, lang, limits):
+        Limit = env['sds.exposure.limit']
+        selections = {fname: dict(field._description_selection(env))
+                      for fname, field in Limit._fields.items() if field.type == 'selection'}
+        digits = Limit._fields['value'].digits[1]
+        for limit in limits:
+            for fname, labels in selections.items():
+                limit[fname] = labels.get(limit[fname], '')
+            for fname in ('date_from', 'date_to'):
+                limit[fname] = tools.format_date(env, limit[fname], lang_code=lang) if limit[fname] else ''
+            limit['value'] = tools.float_repr(limit['value'], digits).rstrip('0').rstrip('.')
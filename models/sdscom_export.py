@@ -0,0 +1,219 @@
+# -*- coding: utf-8 -*-
+
+import logging
+import os
+import re
+import time
+import zipfile
+
+from lxml import etree
+
+from odoo import models, api, tools, _
+from odoo.exceptions import AccessError
+
+from .sdscom_import import SDSCOM_SECTIONS, SDSCOM_FIELDS
+
+_logger = logging.getLogger(__name__)
+
+# element of the datasheet fields written with a dedicated element (the opposite of the import)
+SDSCOM_ELEMENTS = {fname: element for element, fname in SDSCOM_FIELDS.items()}
+SECTION_RE = re.compile(r'^section_(\d+)(?:_|$)')
+# fields written by the section specific methods
+SDSCOM_SPECIAL_FIELDS = ('section_1_3', 'section_2_1', 'section_2_2_pictograms', 'section_2_2_signal',
+                         'section_2_2_P', 'section_3_2', 'section_9_1')
+
+
+class SdsSdscomExport(models.AbstractModel):
+    """
+    Export of datasheets in SDScom XML format, one document for each datasheet and language, in a zip
+    archive or in a directory. The datasheets are read in batches with sds.report.data (in the
+    language of the document) and every document is written element by element with lxml.etree.xmlfile
+    straight to its file, so the memory used depends on batch_size and not on the number of documents.
+    The elements are the ones understood by sds.sdscom.import.
+    """
+    _name = "sds.sdscom.export"
+    _description = "SDScom XML export"
+
+    @api.model
+    def export_datasheets(self, datasheet_ids, langs, output, batch_size=100):
+        """
+        :param datasheet_ids: ids of the datasheets to export
+        :param langs: list of language codes, one document is written for each datasheet and language
+        :param output: path of a zip archive (*.zip) or of a directory of the server, or a file object
+                       where the zip archive is written
+        :param batch_size: number of datasheets read at once
+        :return: dictionary with 'documents' (number of documents written), 'seconds' and 'rate'
+                 (documents per second)
+        """
+        if isinstance(output, str) and not self.env.user._is_system():
+            raise AccessError(_("Only the administrators can export to a server path"))
+        start = time.time()
+        count = 0
+        total = len(datasheet_ids) * len(langs)
+        archive = None
+        if not isinstance(output, str) or output.lower().endswith('.zip'):
+            archive = zipfile.ZipFile(output, 'w', zipfile.ZIP_DEFLATED)
+        else:
+            os.makedirs(output, exist_ok=True)
+        try:
+            for lang in langs:
+                for index in range(0, len(datasheet_ids), batch_size):
+                    batch = datasheet_ids[index:index + batch_size]
+                    for datasheet in self.env['sds.report.data'].get_datasheets(batch, lang, formatted=False):
+                        filename = 'SDS_%s_%s.xml' % (datasheet.id, lang)
+                        if archive:
+                            with archive.open(filename, 'w') as stream:
+                                self._write_datasheet(stream, datasheet, lang)
+                        else:
+                            with open(os.path.join(output, filename), 'wb') as stream:
+                                self._write_datasheet(stream, datasheet, lang)
+                        count += 1
+                    # the values of the batch are no longer needed
+                    self.invalidate_cache()
+                    elapsed = time.time() - start
+                    _logger.info("SDScom export: %d/%d documents, %.1f documents/s",
+                                 count, total, count / elapsed if elapsed else 0.0)
+        finally:
+            if archive:
+                archive.close()
+        elapsed = time.time() - start
+        result = {'documents': count, 'seconds': elapsed, 'rate': count / elapsed if elapsed else 0.0}
+        _logger.info("SDScom export: %d documents in %.1fs (%.1f documents/s)",
+                     count, elapsed, result['rate'])
+        return result
+
+    @api.model
+    def export_all(self, output, langs=None, batch_size=100):
+        """
+        Export the whole catalogue, e.g. from a scheduled action
+        :param langs: list of language codes, all the installed languages if None
+        :return: see export_datasheets
+        """
+        if langs is None:
+            langs = [code for code, name in self.env['res.lang'].get_installed()]
+        return self.export_datasheets(self.env['sds.datasheet'].search([]).ids, langs, output,
+                                      batch_size=batch_size)
+
+    @api.model
+    def _section_fields(self):
+        """
+        :return: dictionary {section: [(field name, field)]} of the fields written as generic texts
+        """
+        sections = {}
+        for fname, field in self.env['sds.datasheet']._fields.items():
+            match = SECTION_RE.match(fname)
+            if not match or fname in SDSCOM_SPECIAL_FIELDS or field.type == 'boolean':
+                continue
+            if field.type in ('many2many', 'one2many') and field.comodel_name != 'sds.sentences':
+                continue
+            sections.setdefault(int(match.group(1)), []).append((fname, field))
+        return sections
+
+    @api.model
+    def _write_datasheet(self, stream, datasheet, lang):
+        section_fields = self._section_fields()
+        signals = dict(self.env['sds.datasheet']._fields['section_2_2_signal']._description_selection(
+            self.with_context(lang=lang).env))
+        with etree.xmlfile(stream, encoding='utf-8') as xf:
+            xf.write_declaration()
+            with xf.element('Datasheet', {'lang': lang}):
+                with xf.element('DocumentInformation'):
+                    self._write_text(xf, 'RevisionDate', str(datasheet.revision_date or ''))
+                    self._write_text(xf, 'SupersedesDate', datasheet.supersedes_date)
+                for element, section in sorted(SDSCOM_SECTIONS.items(), key=lambda item: item[1]):
+                    with xf.element(element):
+                        if section == 1:
+                            with xf.element('SupplierInformation'):
+                                for line in tools.html2plaintext(datasheet.section_1_3 or '').splitlines():
+                                    self._write_text(xf, 'FreeText', line)
+                        elif section == 2:
+                            self._write_classification(xf, datasheet, signals)
+                        elif section == 3:
+                            self._write_components(xf, datasheet)
+                        elif section == 8:
+                            self._write_exposure_limits(xf, datasheet)
+                        elif section == 9:
+                            self._write_properties(xf, datasheet)
+                        for fname, field in section_fields.get(section, []):
+                            self._write_field(xf, fname, field, datasheet[fname])
+
+    @api.model
+    def _write_text(self, xf, tag, text):
+        if text:
+            element = etree.Element(tag)
+            element.text = text
+            xf.write(element)
+
+    @api.model
+    def _write_phrase(self, xf, code, text):
+        phrase = etree.Element('Phrase')
+        if code:
+            etree.SubElement(phrase, 'PhraseCode').text = code
+        if text:
+            etree.SubElement(phrase, 'FullText').text = text
+        xf.write(phrase)
+
+    @api.model
+    def _write_field(self, xf, fname, field, value):
+        if field.type == 'many2many':
+            if value:
+                with xf.element('Subsection', {'name': fname}):
+                    for sentence in value:
+                        self._write_phrase(xf, None, sentence.name)
+            return
+        if field.type == 'html':
+            value = tools.html2plaintext(value or '')
+        if not value:
+            return
+        if fname in SDSCOM_ELEMENTS:
+            self._write_text(xf, SDSCOM_ELEMENTS[fname], value)
+        else:
+            with xf.element('Subsection', {'name': fname}):
+                self._write_text(xf, 'FreeText', value)
+
+    @api.model
+    def _write_classification(self, xf, datasheet, signals):
+        for line in datasheet.section_2_1:
+            with xf.element('Classification'):
+                self._write_text(xf, 'HazardClassAndCategory', line.Classification.name)
+                self._write_phrase(xf, line.HazardStatement.code, line.HazardStatement.name)
+        if not datasheet.section_2_2_selector:
+            with xf.element('LabelElements'):
+                self._write_text(xf, 'SignalWord', signals.get(datasheet.section_2_2_signal))
+                for pictogram in datasheet.section_2_2_pictograms:
+                    self._write_text(xf, 'Pictogram', pictogram.name)
+                for statement in datasheet.section_2_2_P:
+                    self._write_phrase(xf, statement.name, statement.description)
+
+    @api.model
+    def _write_components(self, xf, datasheet):
+        for line in datasheet.section_3_2:
+            component = etree.Element('Component')
+            for tag, value in (('ChemicalName', line.substance.name), ('CasNo', line.substance.CASno),
+                               ('EcNo', line.substance.ECno), ('Concentration', line.concentration)):
+                if value:
+                    etree.SubElement(component, tag).text = value
+            xf.write(component)
+
+    @api.model
+    def _write_exposure_limits(self, xf, datasheet):
+        Limit = self.env['sds.exposure.limit']
+        for limit in datasheet.exposure_limit_ids:
+            element = etree.Element('ExposureLimit', {'type': limit.limit_type})
+            etree.SubElement(element, 'Value').text = repr(limit.value)
+            etree.SubElement(element, 'Unit').text = dict(Limit.UNITS).get(limit.unit, '')
+            for fname in ('substance_id', 'duration', 'population', 'effect', 'route', 'compartment',
+                          'region', 'legislation', 'date_from', 'date_to'):
+                value = limit[fname].name if fname == 'substance_id' else limit[fname]
+                if value:
+                    etree.SubElement(element, ''.join(part.title() for part in fname.split('_'))).text = \
+                        str(value)
+            xf.write(element)
+
+    @api.model
+    def _write_properties(self, xf, datasheet):
+        for line in datasheet.section_9_1:
+            element = etree.Element('Property')
+            etree.SubElement(element, 'Name').text = line.name_id.name or ''
+            etree.SubElement(element, 'Value').text = line.value or ''
+            xf.write(element)
@@ -0,0 +1,419 @@
+# -*- coding: utf-8 -*-
+
+import logging
+import os
+import re
+import time
+import zipfile
+
+from lxml import etree
+
+from odoo import models, api, tools, _
+from odoo.exceptions import AccessError, UserError
+
+_logger = logging.getLogger(__name__)
+
+# SDScom XML (ESCom standard phrases exchange format): element of each of the 16 sections of the SDS.
+# The elements are matched by local name, whatever their namespace (the namespace changes with the
+# version of the schema).
+SDSCOM_SECTIONS = {
+    'Identification': 1,
+    'HazardIdentification': 2,
+    'Composition': 3,
+    'FirstAidMeasures': 4,
+    'FireFightingMeasures': 5,
+    'AccidentalReleaseMeasures': 6,
+    'HandlingAndStorage': 7,
+    'ExposureControlPersonalProtection': 8,
+    'PhysicalChemicalProperties': 9,
+    'StabilityReactivity': 10,
+    'ToxicologicalInformation': 11,
+    'EcologicalInformation': 12,
+    'DisposalConsiderations': 13,
+    'TransportInformation': 14,
+    'RegulatoryInfo': 15,
+    'OtherInformation': 16,
+}
+# elements whose text is a datasheet field; the text of the others ends in the notes of their section
+SDSCOM_FIELDS = {
+    'TradeName': 'section_1_1',
+    'RelevantIdentifiedUse': 'section_1_2',
+    'EmergencyPhone': 'section_1_4',
+    'UnNumber': 'section_14_1',
+    'ProperShippingName': 'section_14_2',
+    'TransportHazardClass': 'section_14_3',
+    'PackingGroup': 'section_14_4',
+    'EnvironmentalHazards': 'section_14_5',
+    'SpecialPrecautionsForUser': 'section_14_6',
+    'TransportInBulk': 'section_14_7',
+    'RevisionDate': 'revision_date',
+    'SupersedesDate': 'supersedes_date',
+}
+# text elements of the phrases and free texts
+SDSCOM_TEXTS = ('FullText', 'PhraseText', 'FreeText')
+# element of a line of the classification (section 2.1): hazard class and category, and its statements
+SDSCOM_CLASSIFICATION = 'Classification'
+# element of the other fields written by the export (sds.sdscom.export), its 'name' is the datasheet field
+SDSCOM_SUBSECTION = 'Subsection'
+# elements of the mixture components (section 3.2) and their values
+SDSCOM_COMPONENT = 'Component'
+SDSCOM_COMPONENT_FIELDS = {
+    'ChemicalName': 'name',
+    'CasNo': 'cas',
+    'EcNo': 'ec',
+    'Concentration': 'concentration',
+}
+SDSCOM_SIGNAL_WORDS = {'danger': 'danger', 'warning': 'warning', 'gefahr': 'danger', 'achtung': 'warning',
+                       'pericolo': 'danger', 'attenzione': 'warning', 'danger.': 'danger', 'attention': 'warning'}
+CODE_RE = re.compile(r'^(EUH\d{3}[A-Za-z]?|H\d{3}[A-Za-z]{0,2}|P\d{3}(?:\+P\d{3})*|GHS0\d)$')
+
+
+def localname(tag):
+    return etree.QName(tag).localname
+
+
+class SdscomParser(object):
+    """
+    Streaming parser of a SDScom XML document: the elements are handled at their end and cleared
+    immediately, so the memory used does not depend on the size of the document.
+    The result is a dictionary of plain values (codes, texts, components) resolved later in batch.
+    """
+
+    def __init__(self):
+        self.stack = []
+        self.result = {
+            'fields': {},
+            'notes': {},
+            'hazard_statements': [],
+            'classifications': [],  # (hazard class and category, [statement codes]) of each classification
+            'pictograms': [],
+            'precautionary_statements': [],
+            'components': [],
+            'subsections': {},  # {datasheet field: [texts]}
+            'lang': None,  # language of the document, written by the export
+        }
+        self.component = None
+        self.classification = None
+        self.subsection = None
+        # depth of the element (e.g. a phrase) whose code was matched: its texts are not kept in the notes
+        self.coded_depth = None
+
+    def section(self):
+        for name in reversed(self.stack):
+            if name in SDSCOM_SECTIONS:
+                return SDSCOM_SECTIONS[name]
+        return None
+
+    def parse(self, source):
+        # supplier files: no entities, no network access, and the default limits of libxml2 on the depth
+        # and on the size of the text nodes
+        for event, element in etree.iterparse(source, events=('start', 'end'), remove_comments=True,
+                                              resolve_entities=False, no_network=True):
+            if not isinstance(element.tag, str):
+                continue
+            name = localname(element.tag)
+            if event == 'start':
+                if not self.stack:
+                    self.result['lang'] = element.get('lang')
+                self.stack.append(name)
+                if name == SDSCOM_SUBSECTION:
+                    self.subsection = element.get('name')
+                elif name == SDSCOM_COMPONENT:
+                    self.component = {}
+                elif name == SDSCOM_CLASSIFICATION and self.section() == 2:
+                    self.classification = (None, [])
+                continue
+            self.stack.pop()
+            if self.coded_depth is not None and len(self.stack) < self.coded_depth:
+                self.coded_depth = None
+            self.end(name, (element.text or '').strip())
+            # free the memory of the elements already handled
+            element.clear()
+            while element.getprevious() is not None:
+                del element.getparent()[0]
+        return self.result
+
+    def end(self, name, text):
+        result = self.result
+        if name == SDSCOM_COMPONENT:
+            if self.component:
+                result['components'].append(self.component)
+            self.component = None
+            return
+        if name == SDSCOM_CLASSIFICATION and self.classification is not None:
+            result['classifications'].append(self.classification)
+            self.classification = None
+            return
+        if name == SDSCOM_SUBSECTION:
+            self.subsection = None
+            return
+        if not text:
+            return
+        if self.component is not None and name in SDSCOM_COMPONENT_FIELDS:
+            self.component[SDSCOM_COMPONENT_FIELDS[name]] = text
+        elif name in SDSCOM_FIELDS:
+            result['fields'].setdefault(SDSCOM_FIELDS[name], []).append(text)
+        elif name == 'SignalWord':
+            result['fields']['section_2_2_signal'] = [SDSCOM_SIGNAL_WORDS.get(text.lower(), '')]
+        elif name == 'HazardClassAndCategory':
+            if self.classification is not None:
+                self.classification = (text, self.classification[1])
+            else:
+                result['classifications'].append((text, []))
+        elif CODE_RE.match(text) and self.section() == 2:
+            # phrase codes of the classification and of the label
+            self.coded_depth = len(self.stack)
+            if text.startswith('GHS'):
+                result['pictograms'].append(text)
+            elif text.startswith('P'):
+                result['precautionary_statements'].append(text)
+            elif self.classification is not None:
+                self.classification[1].append(text)
+            else:
+                result['hazard_statements'].append(text)
+        elif name in SDSCOM_TEXTS and self.subsection:
+            result['subsections'].setdefault(self.subsection, []).append(text)
+        elif name in SDSCOM_TEXTS and self.section():
+            if 'SupplierInformation' in self.stack:
+                result['fields'].setdefault('section_1_3', []).append(text)
+            elif self.coded_depth is None:
+                result['notes'].setdefault(self.section(), []).append(text)
+        elif 'SupplierInformation' in self.stack:
+            result['fields'].setdefault('section_1_3', []).append(text)
+
+
+class SdsSdscomImport(models.AbstractModel):
+    """
+    Import of supplier safety data sheets in SDScom XML format.
+    Each file is parsed with a streaming parser and becomes a new sds.datasheet: the statements,
+    pictograms and hazard classes are matched by code, the mixture components by CAS/EC number.
+    The reference data is read once per import, every file is created in its own savepoint (an error
+    only skips that file) and the transaction is committed every batch_size files.
+    """
+    _name = "sds.sdscom.import"
+    _description = "SDScom XML import"
+
+    @api.model
+    def import_directory(self, path, batch_size=100, create_products=False):
+        """
+        Import all the *.xml files of a directory of the server, e.g. from a scheduled action
+        :return: see import_files
+        """
+        if not self.env.user._is_system():
+            raise AccessError(_("Only the administrators can import the files of a server directory"))
+        names = sorted(name for name in os.listdir(path) if name.lower().endswith('.xml'))
+        return self.import_files(((name, os.path.join(path, name)) for name in names),
+                                 batch_size=batch_size, create_products=create_products)
+
+    @api.model
+    def import_zip(self, zip_file, batch_size=100, create_products=False):
+        """
+        Import all the *.xml files of a zip archive
+        :param zip_file: path or file object of the archive
+        :return: see import_files
+        """
+        with zipfile.ZipFile(zip_file) as archive:
+            names = sorted(name for name in archive.namelist() if name.lower().endswith('.xml'))
+            return self.import_files(((name, archive.open(name)) for name in names),
+                                     batch_size=batch_size, create_products=create_products)
+
+    @api.model
+    def import_files(self, files, batch_size=100, create_products=False):
+        """
+        :param files: iterable of (file name, path or file object)
+        :param batch_size: number of files imported between two commits, 0 to never commit
+        :param create_products: create the product (product.template named after the trade name)
+                                when it does not exist, otherwise the file is skipped
+        :return: dictionary with 'datasheets' (ids of the datasheets created), 'errors' and 'warnings'
+                 (lists of (file name, message)) and 'seconds'
+        """
+        start = time.time()
+        refs = self._reference_maps()
+        result = {'datasheets': [], 'errors': [], 'warnings': []}
+        count = 0
+        for filename, source in files:
+            count += 1
+            warnings = []
+            refs['added'] = []
+            try:
+                with self.env.cr.savepoint():
+                    parsed = SdscomParser().parse(source)
+                    vals = self._datasheet_values(parsed, refs, warnings, create_products)
+                    datasheet = self.env['sds.datasheet'].create(vals)
+                result['datasheets'].append(datasheet.id)
+            except Exception as e:
+                _logger.warning("SDScom import of %s failed: %s", filename, e)
+                result['errors'].append((filename, tools.ustr(e)))
+                # the records created for this file were rolled back with the savepoint
+                for ref, key in refs['added']:
+                    del refs[ref][key]
+                self.invalidate_cache()
+            finally:
+                if hasattr(source, 'close'):
+                    source.close()
+            result['warnings'].extend((filename, warning) for warning in warnings)
+            if batch_size and count % batch_size == 0:
+                self.env.cr.commit()
+                _logger.info("SDScom import: %d files, %d errors", count, len(result['errors']))
+        result['seconds'] = time.time() - start
+        _logger.info("SDScom import: %d datasheets created from %d files in %.1fs, %d errors",
+                     len(result['datasheets']), count, result['seconds'], len(result['errors']))
+        return result
+
+    @api.model
+    def _reference_maps(self):
+        """
+        :return: dictionary of {code: id} of the reference data, read once for the whole import
+        """
+        def codes(model, field_name, domain=None):
+            return {record[field_name]: record['id']
+                    for record in self.env[model].with_context(active_test=False).search_read(domain or [],
+                                                                                             [field_name])}
+        substances = self.env['sds.chemical.substances'].search_read([], ['CASno', 'ECno'])
+        return {
+            'hazard_statements': codes('sds.hazard.statement', 'code', [('retired', '=', False)]),
+            'hazard_classes': codes('sds.hazard.class', 'name', [('retired', '=', False)]),
+            'precautionary_statements': codes('sds.precautionary.statement', 'name', [('retired', '=', False)]),
+            'pictograms': codes('sds.pictogram', 'name'),
+            'cas': {substance['CASno'].strip(): substance['id'] for substance in substances if substance['CASno']},
+            'ec': {substance['ECno'].strip(): substance['id'] for substance in substances if substance['ECno']},
+            'products': {},
+            'sentences': {},  # {lang: {sentence: id}}, see _sentences
+            'added': [],  # (map, key) added by the file being imported
+        }
+
+    @api.model
+    def _datasheet_values(self, parsed, refs, warnings, create_products):
+        # the same value may be repeated, e.g. the UN number for each mode of transport
+        fields = {fname: list(tools.OrderedSet(values)) for fname, values in parsed['fields'].items() if values}
+        trade_name = fields.get('section_1_1', [None])[0]
+        if not trade_name:
+            raise UserError(_("The trade name of the product is missing"))
+        vals = {
+            'name': trade_name,
+            'product_id': self._product(trade_name, refs, create_products),
+        }
+        Datasheet = self.env['sds.datasheet']
+        for fname, values in parsed['subsections'].items():
+            field = Datasheet._fields.get(fname)
+            if not field or not self._subsection_field(field):
+                warnings.append(_("Unknown subsection %s") % fname)
+            elif fname in fields:
+                # already read from its own element
+                continue
+            elif field.type == 'many2many':
+                sentences = self._sentences(refs, parsed['lang'])
+                vals[fname] = [(6, 0, self._match(values, sentences, _("Unknown sentence %s"), warnings))]
+            else:
+                fields[fname] = values
+        for fname, values in fields.items():
+            field = Datasheet._fields[fname]
+            if field.type == 'html':
+                vals[fname] = '<p>%s</p>' % '<br/>'.join(tools.html_escape(line) for value in values
+                                                         for line in value.splitlines())
+            elif field.type == 'date':
+                vals[fname] = values[0][:10]
+            elif field.type == 'selection':
+                vals[fname] = values[0] or False
+            else:
+                vals[fname] = '\n'.join(values) if field.type == 'text' else ', '.join(values)
+        for section, texts in parsed['notes'].items():
+            note = 'section_%d_note' % section
+            vals[note] = (vals.get(note) or '') + ''.join('<p>%s</p>' % tools.html_escape(text) for text in texts)
+
+        # section 2: classification and label elements
+        # one line for each statement of each classification, as written by the export
+        pairs = []
+        for class_name, codes in parsed['classifications']:
+            class_id = refs['hazard_classes'].get(class_name, False)
+            if class_name and not class_id:
+                warnings.append(_("Unknown hazard class %s") % class_name)
+            statement_ids = self._match(codes, refs['hazard_statements'], _("Unknown hazard statement %s"),
+                                        warnings)
+            for statement_id in statement_ids or [False]:
+                if (class_id or statement_id) and (class_id, statement_id) not in pairs:
+                    pairs.append((class_id, statement_id))
+        # statements outside of a classification, e.g. those of the label only
+        classified = [statement_id for class_id, statement_id in pairs]
+        for statement_id in self._match(parsed['hazard_statements'], refs['hazard_statements'],
+                                        _("Unknown hazard statement %s"), warnings):
+            if statement_id not in classified:
+                pairs.append((False, statement_id))
+        criteria = [(0, 0, {'Classification': class_id, 'HazardStatement': statement_id})
+                    for class_id, statement_id in pairs]
+        vals['section_2_1'] = criteria
+        vals['section_2_1_selector'] = not criteria
+        vals['section_2_2_pictograms'] = [(6, 0, self._match(parsed['pictograms'], refs['pictograms'],
+                                                            _("Unknown pictogram %s"), warnings))]
+        vals['section_2_2_P'] = [(6, 0, self._match(parsed['precautionary_statements'],
+                                                   refs['precautionary_statements'],
+                                                   _("Unknown precautionary statement %s"), warnings))]
+        vals['section_2_2_selector'] = not (parsed['pictograms'] or parsed['precautionary_statements'])
+
+        # section 3.2: mixture components
+        mixture = []
+        for component in parsed['components']:
+            cas = (component.get('cas') or '').strip()
+            ec = (component.get('ec') or '').strip()
+            substance_id = refs['cas'].get(cas) or refs['ec'].get(ec)
+            if not substance_id:
+                substance = self.env['sds.chemical.substances'].create({
+                    'name': component.get('name') or cas or ec,
+                    'CASno': cas,
+                    'ECno': ec,
+                })
+                substance_id = substance.id
+                for ref, key in (('cas', cas), ('ec', ec)):
+                    if key:
+                        refs[ref][key] = substance_id
+                        refs['added'].append((ref, key))
+                warnings.append(_("New substance %s (CAS %s, EC %s)") % (substance.name, cas or '-', ec or '-'))
+            mixture.append((0, 0, {'substance': substance_id, 'concentration': component.get('concentration')}))
+        vals['section_3_2'] = mixture
+        vals['section_3_2_selector'] = bool(mixture)
+        return vals
+
+    @api.model
+    def _subsection_field(self, field):
+        """
+        :return: whether the field can be read from a Subsection element, i.e. it is written as such by
+                 the export (see sds.sdscom.export._section_fields)
+        """
+        if field.type == 'many2many':
+            return field.comodel_name == 'sds.sentences'
+        return field.type in ('char', 'text', 'html', 'selection', 'date')
+
+    @api.model
+    def _sentences(self, refs, lang):
+        """
+        :return: {sentence: id} of the action sentences in the language of the document, read once per import
+        """
+        lang = lang or self.env.lang or 'en_US'
+        if lang not in refs['sentences']:
+            Sentences = self.env['sds.sentences'].with_context(lang=lang)
+            refs['sentences'][lang] = {sentence['name']: sentence['id']
+                                       for sentence in Sentences.search_read([('retired', '=', False)], ['name'])
+                                       if sentence['name']}
+        return refs['sentences'][lang]
+
+    @api.model
+    def _match(self, codes, ref, message, warnings):
+        ids = []
+        for code in codes:
+            if code not in ref:
+                warnings.append(message % code)
+            elif ref[code] not in ids:
+                ids.append(ref[code])
+        return ids
+
+    @api.model
+    def _product(self, trade_name, refs, create_products):
+        if trade_name not in refs['products']:
+            product = self.env['product.template'].search([('name', '=', trade_name)], limit=1)
+            if not product and create_products:
+                product = self.env['product.template'].create({'name': trade_name})
+                refs['added'].append(('products', trade_name))
+            refs['products'][trade_name] = product.id
+        if not refs['products'][trade_name]:
+            raise UserError(_("No product named %s") % trade_name)
+        return refs['products'][trade_name]
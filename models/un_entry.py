@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+
+import re
+
+from odoo import models, fields, api
+from odoo.osv import expression
+from odoo.tools import sql
+
+# UN number typed in the autocomplete of the section 14, e.g. '1090', 'UN1090', 'UN 10'
+UN_NUMBER_RE = re.compile(r'^\s*(?:UN\s*)?(\d{1,4})\s*$', re.IGNORECASE)
+
+
+class SdsUnEntry(models.Model):
+    """
+    Entries of the dangerous goods list of the UN Model Regulations / ADR (table A of chapter 3.2), used to
+    fill the transport information of section 14. The same UN number has one entry per packing group.
+    The entries are loaded from data/regulation/un_entry.csv by sds.regulation.dataset like the other
+    reference data, and the proper shipping names are translated in data/regulation/i18n/.
+    """
+    _name = "sds.un.entry"
+    _description = "UN dangerous goods entry"
+    _order = "un_number, packing_group, id"
+
+    PACKING_GROUPS = [('I', 'I'), ('II', 'II'), ('III', 'III')]
+
+    un_number = fields.Char('UN number', size=4, required=True, help='Four digits, e.g. 1090')
+    name = fields.Char('Proper shipping name', required=True, translate=True)
+    hazard_class = fields.Char('Class', required=True, help='Class or division, e.g. 3, 2.1, 6.1')
+    subsidiary_risk = fields.Char('Subsidiary hazards', help='Classes of the subsidiary hazards, e.g. 6.1')
+    packing_group = fields.Selection(PACKING_GROUPS, 'Packing group')
+    environmental_hazard = fields.Boolean('Environmentally hazardous',
+                                          help='Always marked as environmentally hazardous substance')
+    atp_version = fields.Char('Regulation edition', help='Edition of ADR/UN Model Regulations of the entry')
+    retired = fields.Boolean('Retired', help='No longer part of the regulation reference data')
+
+    @api.model_cr
+    def init(self):
+        # prefix search of the autocomplete (LIKE '10%'), whatever the collation of the database
+        sql.create_index(self._cr, 'sds_un_entry_un_number_index', self._table, ['un_number varchar_pattern_ops'])
+        # products shipping under a class and packing group, see get_products
+        sql.create_index(self._cr, 'sds_un_entry_class_index', self._table, ['hazard_class', 'packing_group'])
+
+    @api.multi
+    def name_get(self):
+        result = []
+        for entry in self:
+            detail = entry.hazard_class
+            if entry.packing_group:
+                detail += ', PG %s' % entry.packing_group
+            result.append((entry.id, 'UN%s %s (%s)' % (entry.un_number, entry.name, detail)))
+        return result
+
+    @api.model
+    def _name_search(self, name, args=None, operator='ilike', limit=100, name_get_uid=None):
+        """
+        Autocomplete on the UN number (prefix, with or without 'UN') or on the proper shipping name
+        """
+        args = args or []
+        if name and operator in ('ilike', 'like', '=', '=like', '=ilike'):
+            number = UN_NUMBER_RE.match(name)
+            if number:
+                domain = [('un_number', '=like', number.group(1) + '%')]
+            else:
+                domain = [('name', operator, name)]
+            entry_ids = self._search(expression.AND([domain, args]), limit=limit, access_rights_uid=name_get_uid)
+            return self.browse(entry_ids).name_get()
+        return super(SdsUnEntry, self)._name_search(name, args=args, operator=operator, limit=limit,
+                                                    name_get_uid=name_get_uid)
+
+    @api.model
+    def get_products(self, hazard_class, packing_group=None):
+        """
+        Products whose datasheet ships under a class (and packing group), e.g. the flammable liquids of
+        packing group II for the planning of the warehouse: get_products('3', 'II')
+        :param hazard_class: class or division of the entries
+        :param packing_group: one of PACKING_GROUPS, None for any packing group
+        :return: product.template recordset
+        """
+        self.check_access_rights('read')
+        query = """
+            SELECT DISTINCT d.product_id
+            FROM sds_un_entry e
+            JOIN sds_datasheet d ON d.un_entry_id = e.id
+            WHERE e.hazard_class = %s
+        """
+        params = [hazard_class]
+        if packing_group:
+            query += " AND e.packing_group = %s"
+            params.append(packing_group)
+        self.env.cr.execute(query, params)
+        product_ids = [row[0] for row in self.env.cr.fetchall()]
+        return self.env['product.template'].search([('id', 'in', product_ids)])
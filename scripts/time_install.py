@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Measure the install and upgrade time of the safety_datasheet module on a local PostgreSQL.
+
+A template database with the dependencies (and the requested languages) is created once, then for each
+run a fresh copy of it is made and the module is installed and upgraded with odoo-bin --stop-after-init.
+The wall time and the number of SQL queries reported by the Odoo module loader are printed at the end.
+
+Example:
+    python3 scripts/time_install.py --odoo-bin ~/odoo/odoo-bin --addons-path ~/odoo/addons,~/extra \\
+        --lang it_IT,fr_FR --repeat 5
+"""
+
+import argparse
+import re
+import statistics
+import subprocess
+import time
+
+MODULE = 'safety_datasheet'
+DEPENDENCIES = 'product,web_tree_image_tooltip'
+# e.g. "odoo.modules.loading: 52 modules loaded in 3.21s, 4863 queries"
+LOADED_RE = re.compile(r'modules loaded in ([\d.]+)s, (\d+) queries')
+
+
+def odoo(args, database, *options):
+    cmd = [args.odoo_bin, '-d', database, '--addons-path', args.addons_path, '--stop-after-init',
+           '--without-demo', 'all', '--log-level', 'info'] + list(options) + args.odoo_args
+    start = time.perf_counter()
+    proc = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, universal_newlines=True)
+    elapsed = time.perf_counter() - start
+    if proc.returncode:
+        raise SystemExit('%s failed:\n%s' % (' '.join(cmd), proc.stdout[-3000:]))
+    matches = LOADED_RE.findall(proc.stdout)
+    queries = sum(int(count) for seconds, count in matches)
+    return elapsed, queries
+
+
+def create_db(name, template=None):
+    subprocess.run(['dropdb', '--if-exists', name], check=True)
+    subprocess.run(['createdb', name] + (['-T', template] if template else []), check=True)
+
+
+def report(label, samples):
+    times = [elapsed for elapsed, queries in samples]
+    queries = [queries for elapsed, queries in samples]
+    print('%-10s median %7.2fs  min %7.2fs  max %7.2fs  queries %7d' % (
+        label, statistics.median(times), min(times), max(times), statistics.median(queries)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--odoo-bin', default='odoo-bin')
+    parser.add_argument('--addons-path', required=True)
+    parser.add_argument('--db-prefix', default='sds_bench')
+    parser.add_argument('--lang', default='', help='comma separated languages to install, e.g. it_IT,fr_FR')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('odoo_args', nargs='*', help='extra odoo-bin options (after --), e.g. --db_host=...')
+    args = parser.parse_args()
+
+    template = '%s_template' % args.db_prefix
+    print('Preparing template database %s...' % template)
+    create_db(template)
+    options = ['-i', DEPENDENCIES]
+    if args.lang:
+        options.append('--load-language=%s' % args.lang)
+    odoo(args, template, *options)
+
+    installs, upgrades = [], []
+    database = '%s_run' % args.db_prefix
+    for run in range(args.repeat):
+        create_db(database, template)
+        installs.append(odoo(args, database, '-i', MODULE))
+        upgrades.append(odoo(args, database, '-u', MODULE))
+        print('run %d: install %.2fs, upgrade %.2fs' % (run + 1, installs[-1][0], upgrades[-1][0]))
+
+    print('\n%s (%d runs, languages: %s)' % (MODULE, args.repeat, args.lang or 'en_US'))
+    report('install', installs)
+    report('upgrade', upgrades)
+    subprocess.run(['dropdb', '--if-exists', database], check=True)
+    subprocess.run(['dropdb', '--if-exists', template], check=True)
+
+
+if __name__ == '__main__':
+    main()
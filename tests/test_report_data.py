@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+
+from odoo.tests.common import TransactionCase
+
+
+class TestReportData(TransactionCase):
+    """
+    The values of the SDS report are read model by model for the whole batch (see sds.report.data):
+    printing many datasheets costs the same number of queries as printing one
+    """
+
+    def setUp(self):
+        super(TestReportData, self).setUp()
+        HazardStatement = self.env['sds.hazard.statement']
+        statements = HazardStatement.search([('retired', '=', False)], limit=2)
+        hazard_class = self.env['sds.hazard.class'].search([('retired', '=', False)], limit=1)
+        substance = self.env['sds.chemical.substances'].search([], limit=1)
+        chemical_property = self.env['sds.chemical.properties'].search([], limit=1)
+        pictograms = self.env['sds.pictogram'].search([], limit=2)
+        precautionary = self.env['sds.precautionary.statement'].search([], limit=3)
+        sentences = self.env['sds.sentences'].search([], limit=2)
+        self.datasheets = self.env['sds.datasheet']
+        for index in range(5):
+            product = self.env['product.template'].create({'name': 'Test paint %d' % index})
+            self.datasheets |= self.datasheets.create({
+                'product_id': product.id,
+                'section_1_1': product.name,
+                'section_1_2': 'Paint',
+                'section_2_1': [(0, 0, {'Classification': hazard_class.id, 'HazardStatement': statement.id})
+                                for statement in statements],
+                'section_2_2_pictograms': [(6, 0, pictograms.ids)],
+                'section_2_2_P': [(6, 0, precautionary.ids)],
+                'section_3_2': [(0, 0, {'substance': substance.id, 'concentration': '%d-10%%' % index})],
+                'section_9_1': [(0, 0, {'name_id': chemical_property.id, 'value': '%d °C' % (20 + index)})],
+                'section_4_1_general': [(6, 0, sentences.ids)],
+            })
+
+    def _get_datasheets(self, datasheets):
+        self.env.invalidate_all()
+        return self.env['sds.report.data'].get_datasheets(datasheets.ids, 'en_US')
+
+    def test_query_count(self):
+        # warm up the caches of the registry (languages, selections)
+        self._get_datasheets(self.datasheets)
+
+        count = self.cr.sql_log_count
+        values = self._get_datasheets(self.datasheets[:1])
+        count = self.cr.sql_log_count - count
+        self.assertEqual(len(values), 1)
+
+        with self.assertQueryCount(count):
+            values = self._get_datasheets(self.datasheets)
+        self.assertEqual([value['id'] for value in values], self.datasheets.ids)
+
+    def test_values(self):
+        datasheet = self.datasheets[0]
+        value = self._get_datasheets(datasheet)[0]
+        self.assertEqual(value.section_1_1, datasheet.section_1_1)
+        self.assertEqual(value.product_id.name, datasheet.product_id.name)
+        self.assertEqual([line.HazardStatement.code for line in value.section_2_1],
+                         datasheet.section_2_1.mapped('HazardStatement.code'))
+        self.assertEqual([line.substance.CASno for line in value.section_3_2],
+                         datasheet.section_3_2.mapped('substance.CASno'))
+        self.assertEqual(sorted(line.name_id.name for line in value.section_9_1),
+                         sorted(datasheet.section_9_1.mapped('name_id.name')))
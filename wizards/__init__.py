@@ -1,3 +1,7 @@
 # -*- coding: utf-8 -*-
 
-from . import select_lang
\ No newline at end of file
+from . import select_lang
+from . import print_label
+from . import sdscom_import
+from . import sdscom_export
+from . import clone_datasheet
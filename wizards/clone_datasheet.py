@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+
+from odoo import models, fields, api, _
+from odoo.exceptions import UserError
+
+
+class SdsCloneWizard(models.TransientModel):
+    _name = "sds.clone.wizard"
+    _description = "Copy a datasheet onto many products"
+
+    @api.model
+    def _default_datasheet(self):
+        if self.env.context.get('active_model') == 'sds.datasheet':
+            return self.env.context.get('active_id')
+        return False
+
+    datasheet_id = fields.Many2one('sds.datasheet', 'Master datasheet', required=True, default=_default_datasheet)
+    product_ids = fields.Many2many('product.template', string='Products',
+                                   help='A copy of the master datasheet is created for each product')
+    skip_existing = fields.Boolean('Skip products with a datasheet', default=True)
+
+    @api.multi
+    def clone_datasheet(self):
+        """Call when button 'Copy' clicked.
+               """
+        self.ensure_one()
+        products = self.product_ids
+        if self.skip_existing:
+            existing = self.env['sds.datasheet'].search([('product_id', 'in', products.ids)])
+            products -= existing.mapped('product_id')
+        if not products:
+            raise UserError(_("All the products chosen already have a datasheet"))
+        clones = self.env['sds.datasheet.clone'].clone_datasheet(self.datasheet_id.id, products.ids)
+        action = self.env.ref('safety_datasheet.action_sds').read()[0]
+        action['domain'] = [('id', 'in', clones.ids)]
+        return action
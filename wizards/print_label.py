@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+
+from odoo import models, fields, api
+
+# Minimum label dimensions of CLP Annex I, 1.2.1.4, according to the package capacity
+LABEL_SIZES = [('a8', '52 x 74 mm (up to 3 l)'),
+               ('a7', '74 x 105 mm (from 3 l to 50 l)'),
+               ('a6', '105 x 148 mm (from 50 l to 500 l)'),
+               ('a5', '148 x 210 mm (more than 500 l)')]
+# size of the pictograms in pixels for each label size
+PICTOGRAM_SIZES = {'a8': 96, 'a7': 128, 'a6': 192, 'a5': 256}
+
+
+class SdsLabelWizard(models.TransientModel):
+    _name = "sds.label.wizard"
+    _description = "Print GHS labels"
+
+    @api.model
+    def _default_lang_ids(self):
+        return self.env['res.lang'].search([('code', '=', self.env.lang or 'en_US')])
+
+    @api.multi
+    def get_report(self):
+        """Call when button 'Print' clicked.
+               """
+        data = {
+            'ids': self.env.context.get('active_ids'),
+            'model': 'sds.datasheet',
+            'langs': self.lang_ids.mapped('code'),
+            'size': self.size,
+            'copies': self.copies,
+        }
+        # the paper format depends on the label size, see ir.actions.report
+        report = self.env.ref('safety_datasheet.ghs_label_report').with_context(ghs_label_size=self.size)
+        return report.report_action(self, data=data)
+
+    size = fields.Selection(LABEL_SIZES, string='Label size', required=True, default='a7')
+    lang_ids = fields.Many2many('res.lang', string='Languages', domain=[('translatable', '=', True)],
+                                required=True, default=_default_lang_ids)
+    copies = fields.Integer('Copies of each label', required=True, default=1)
+
+
+class ReportGhsLabel(models.AbstractModel):
+    """Abstract Model for the GHS label template.
+    The labels content is read in batch and passed to the template as plain dictionaries.
+    """
+
+    _name = 'report.safety_datasheet.report_ghs_label'
+    _description = 'Abstract model for GHS labels report'
+
+    @api.model
+    def _get_report_values(self, docids, data=None):
+        data = data or {}
+        ids = data.get('ids') or docids
+        langs = data.get('langs') or [self.env.lang or 'en_US']
+        size = data.get('size') or 'a7'
+        copies = max(data.get('copies') or 1, 1)
+        labels = self.env['sds.datasheet'].browse(ids)._get_label_data(langs, PICTOGRAM_SIZES[size])
+
+        return {
+            'doc_ids': ids,
+            'doc_model': 'sds.datasheet',
+            'size': size,
+            'labels': [label for label in labels for copy in range(copies)],
+        }
@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+
+import os
+import tempfile
+
+from odoo import models, fields, api, tools, _
+
+
+class SdscomExportWizard(models.TransientModel):
+    _name = "sds.sdscom.export.wizard"
+    _description = "Export datasheets in SDScom XML"
+
+    @api.model
+    def _default_lang_ids(self):
+        return self.env['res.lang'].search([('code', '=', self.env.lang or 'en_US')])
+
+    lang_ids = fields.Many2many('res.lang', string='Languages', required=True, default=_default_lang_ids,
+                                domain=[('translatable', '=', True)],
+                                help='One XML file is written for each datasheet and language')
+    directory = fields.Char('Server path', help='Write the files in this directory of the server, or in this zip '
+                                                'archive if it ends with .zip (administrators only)')
+    batch_size = fields.Integer('Datasheets per batch', default=100, required=True)
+    state = fields.Selection([('draft', 'Draft'), ('done', 'Done')], default='draft')
+    result = fields.Text('Result', readonly=True)
+    archive_name = fields.Char('Archive', readonly=True,
+                               help='Name of the zip archive in the export directory, see _archive_path')
+
+    @api.model
+    def _export_directory(self):
+        """
+        Directory of the archives to download, in the filestore of the database so that it is shared by all
+        the workers and servers (the archive may be downloaded by another worker than the one exporting)
+        """
+        directory = os.path.join(tools.config.filestore(self.env.cr.dbname), 'sdscom_export')
+        os.makedirs(directory, exist_ok=True)
+        return directory
+
+    @api.multi
+    def _archive_path(self):
+        """
+        :return: path of the archive of the wizard, None if there is none
+        """
+        self.ensure_one()
+        if not self.archive_name or os.path.basename(self.archive_name) != self.archive_name:
+            return None
+        path = os.path.join(self._export_directory(), self.archive_name)
+        return path if os.path.isfile(path) else None
+
+    @api.multi
+    def export_datasheets(self):
+        """Call when button 'Export' clicked.
+               """
+        self.ensure_one()
+        Exporter = self.env['sds.sdscom.export']
+        datasheet_ids = self.env.context.get('active_ids') or self.env['sds.datasheet'].search([]).ids
+        langs = self.lang_ids.mapped('code')
+        values = {'state': 'done'}
+        if self.directory:
+            result = Exporter.export_datasheets(datasheet_ids, langs, self.directory, batch_size=self.batch_size)
+        else:
+            # the archive is written to a file, never read in memory: it is streamed to the browser by
+            # /safety_datasheet/sdscom_export/<wizard id> and deleted with the wizard
+            handle, path = tempfile.mkstemp(suffix='.zip', prefix='sdscom_', dir=self._export_directory())
+            with os.fdopen(handle, 'wb') as archive:
+                result = Exporter.export_datasheets(datasheet_ids, langs, archive, batch_size=self.batch_size)
+            values['archive_name'] = os.path.basename(path)
+        values['result'] = _("%d documents written in %.1f seconds (%.1f documents/s).") % (
+            result['documents'], result['seconds'], result['rate'])
+        self.write(values)
+        return {
+            'type': 'ir.actions.act_window',
+            'res_model': self._name,
+            'res_id': self.id,
+            'view_mode': 'form',
+            'target': 'new',
+        }
+
+    @api.multi
+    def action_download(self):
+        self.ensure_one()
+        return {
+            'type': 'ir.actions.act_url',
+            'url': '/safety_datasheet/sdscom_export/%d' % self.id,
+            'target': 'self',
+        }
+
+    @api.multi
+    def unlink(self):
+        # also called by the vacuum of the transient records
+        paths = [path for path in (wizard._archive_path() for wizard in self) if path]
+        result = super(SdscomExportWizard, self).unlink()
+        for path in paths:
+            os.unlink(path)
+        return result
@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+
+import base64
+import io
+
+from odoo import models, fields, api, _
+from odoo.exceptions import UserError
+
+
+class SdscomImportWizard(models.TransientModel):
+    _name = "sds.sdscom.import.wizard"
+    _description = "Import SDScom XML datasheets"
+
+    data_file = fields.Binary('File', help='A SDScom XML file or a zip archive of SDScom XML files')
+    filename = fields.Char('File name')
+    directory = fields.Char('Server directory', help='Import all the XML files of this directory of the server '
+                                                     '(administrators only)')
+    create_products = fields.Boolean('Create missing products',
+                                     help='Create a product named after the trade name when none exists, '
+                                          'otherwise the file is not imported')
+    batch_size = fields.Integer('Files per transaction', default=100, required=True)
+    state = fields.Selection([('draft', 'Draft'), ('done', 'Done')], default='draft')
+    result = fields.Text('Result', readonly=True)
+    datasheet_ids = fields.Many2many('sds.datasheet', string='Datasheets created', readonly=True)
+
+    @api.multi
+    def import_datasheets(self):
+        """Call when button 'Import' clicked.
+               """
+        self.ensure_one()
+        Importer = self.env['sds.sdscom.import']
+        options = {'batch_size': self.batch_size, 'create_products': self.create_products}
+        if self.directory:
+            result = Importer.import_directory(self.directory, **options)
+        elif self.data_file:
+            content = io.BytesIO(base64.b64decode(self.data_file))
+            if (self.filename or '').lower().endswith('.zip'):
+                result = Importer.import_zip(content, **options)
+            else:
+                result = Importer.import_files([(self.filename or 'file.xml', content)], **options)
+        else:
+            raise UserError(_("Choose a file or a directory to import"))
+
+        lines = [_("%d datasheets created in %.1f seconds, %d files with errors.") % (
+            len(result['datasheets']), result['seconds'], len(result['errors']))]
+        if result['errors']:
+            lines += ['', _("Errors:")] + ['%s: %s' % error for error in result['errors']]
+        if result['warnings']:
+            lines += ['', _("Warnings:")] + ['%s: %s' % warning for warning in result['warnings']]
+        self.write({
+            'state': 'done',
+            'result': '\n'.join(lines),
+            'datasheet_ids': [(6, 0, result['datasheets'])],
+        })
+        return {
+            'type': 'ir.actions.act_window',
+            'res_model': self._name,
+            'res_id': self.id,
+            'view_mode': 'form',
+            'target': 'new',
+        }
+
+    @api.multi
+    def action_open_datasheets(self):
+        action = self.env.ref('safety_datasheet.action_sds').read()[0]
+        action['domain'] = [('id', 'in', self.datasheet_ids.ids)]
+        return action
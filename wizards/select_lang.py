@@ -1,5 +1,7 @@
 # -*- coding: utf-8 -*-
 
+from werkzeug import urls
+
 from odoo import models, fields, api, _
 
 class SelectLangReportWizard(models.TransientModel):
@@ -26,6 +28,17 @@ class SelectLangReportWizard(models.TransientModel):
         # `report_action()` will call `_get_report_values()` and pass `data` automatically.
         return self.env.ref('safety_datasheet.safety_sds_report').report_action(self, data=data)
 
+    @api.multi
+    def get_preview(self):
+        """Call when button 'Preview' clicked: open the HTML preview of the first datasheet.
+               """
+        datasheet_id = (self.env.context.get('active_ids') or [False])[0]
+        return {
+            'type': 'ir.actions.act_url',
+            'url': '/safety_datasheet/preview/%d?%s' % (datasheet_id, urls.url_encode({'lang': self.lang})),
+            'target': 'new',
+        }
+
     lang = fields.Selection(_get_languages, string='Language', required=True, default='en_US')
 
 class SelectLangRecap(models.AbstractModel):
@@ -41,8 +54,11 @@ class SelectLangRecap(models.AbstractModel):
         if data:
             lang = data['form']['lang'] if data['form'] else 'en_US'
         else:
-            lang = 'en_US'
-        datasheets = self.env['sds.datasheet'].search([('id','in',data['ids'])])
+            # printed without the wizard, e.g. from /report/html
+            data = {'ids': docids, 'model': 'sds.datasheet'}
+            lang = self.env.lang or 'en_US'
+        # plain values read in batch, see sds.report.data
+        datasheets = self.env['sds.report.data'].get_datasheets(data['ids'], lang)
 
         return {
             'doc_ids': data['ids'],